@@ -0,0 +1,197 @@
+from collections import namedtuple
+
+from combat import ATTACK_RANGE, SPIN_RANGE
+from telemetry import ATTACK, DASH, ENEMY, SPIN
+
+# Enemy AI. Every enemy runs one of BEHAVIORS, picked when it spawns from
+# the Balance.*_share mix (by default everyone chases) and kept in
+# Stickman.behavior. EnemyAI runs the behaviors for World.step:
+#
+#   schedule    The AI acts every think_interval(wave) ticks, 3 early on and
+#               2 from wave 10, counted in simulation ticks so it behaves
+#               the same at any frame rate and in headless runs.
+#   budget      A behavior's decision costs `cost` units. With a nonzero
+#               Balance.ai_budget the living enemies are split, in order,
+#               into groups costing at most that much, and only one group
+#               decides per AI tick, taking turns; the rest keep walking the
+#               way they last decided (Stickman.ai_move). The budget counts
+#               decisions rather than measured time so that matches stay
+#               reproducible from seed and inputs.
+#   perception  What the behaviors read about the player is gathered once
+#               per AI tick into a Perception shared by every decision.
+#
+# A behavior's think(ai, enemy, offset) gets the EnemyAI, the enemy and the
+# player's x minus the enemy's, may start swings, dashes or spins through
+# the EnemyAI helpers, and returns the direction to walk: -1, 0 or 1.
+
+KITE_RANGE = 140     # Kiters hold about this far away
+DASH_RANGE = (120, 260)
+ENEMY_SPACING = 20   # Enemies keep this much room between each other
+
+
+def think_interval(wave):
+    return max(3 - wave // 10, 2)  # Slower reaction improvement
+
+
+def toward(offset):
+    return (offset > 0) - (offset < 0)
+
+
+class Perception:
+    # The player as seen by the enemies on one AI tick
+    __slots__ = ('x', 'threat', 'airborne')
+
+    def update(self, player):
+        self.x = player.x
+        self.threat = player.attacking or player.spinning
+        self.airborne = player.is_jumping
+
+
+def chase(ai, enemy, offset):
+    # Walk at the player and swing whenever in reach
+    if abs(offset) < ATTACK_RANGE and not enemy.attacking:
+        ai.swing(enemy)
+        return 0
+    return toward(offset)
+
+
+def kite(ai, enemy, offset):
+    # Hang back out of reach, back off while the player is swinging and
+    # punish a player who walks in without attacking
+    distance = abs(offset)
+    if ai.seen.threat and distance < KITE_RANGE:
+        return -toward(offset)
+    if distance < ATTACK_RANGE:
+        if not enemy.attacking:
+            ai.swing(enemy)
+        return 0
+    return toward(offset) if distance > KITE_RANGE else 0
+
+
+def dash_in(ai, enemy, offset):
+    # Close long gaps with a dash, then fight like a chaser
+    if DASH_RANGE[0] < abs(offset) < DASH_RANGE[1]:
+        ai.dash(enemy, toward(offset))
+    return chase(ai, enemy, offset)
+
+
+def aerial(ai, enemy, offset):
+    # Open with spin attacks from the ground when close, swing otherwise
+    if (abs(offset) < SPIN_RANGE and not enemy.is_jumping and not enemy.attacking
+            and not ai.seen.airborne and ai.spin(enemy)):
+        return 0
+    return chase(ai, enemy, offset)
+
+
+Behavior = namedtuple('Behavior', 'name think cost')
+
+BEHAVIORS = (
+    Behavior('chase', chase, 1),
+    Behavior('kite', kite, 2),
+    Behavior('dash_in', dash_in, 2),
+    Behavior('aerial', aerial, 2),
+)
+BEHAVIOR_NAMES = tuple(behavior.name for behavior in BEHAVIORS)
+CHASE = 0
+
+
+def pick_behavior(balance, rng):
+    # Index into BEHAVIORS for a new enemy. Draws from rng only when the
+    # balance mixes in other behaviors, so all-chase matches are unchanged.
+    shares = (balance.kite_share, balance.dash_in_share, balance.aerial_share)
+    if not any(shares):
+        return CHASE
+    roll = rng.random()
+    for behavior, share in enumerate(shares, 1):
+        if roll < share:
+            return behavior
+        roll -= share
+    return CHASE
+
+
+def think_window(enemies, budget, turn):
+    # Split `enemies` into consecutive groups whose behaviors cost at most
+    # `budget` (each holds at least one) and return the (start, end) of
+    # group `turn` modulo their number; everyone for a budget of 0
+    if budget <= 0:
+        return 0, len(enemies)
+    bounds = [0]
+    total = 0
+    for i, enemy in enumerate(enemies):
+        cost = BEHAVIORS[enemy.behavior].cost
+        if total + cost > budget and i > bounds[-1]:
+            bounds.append(i)
+            total = 0
+        total += cost
+    bounds.append(len(enemies))
+    group = turn % (len(bounds) - 1)
+    return bounds[group], bounds[group + 1]
+
+
+class EnemyAI:
+    def __init__(self, world):
+        self.world = world
+        self.seen = Perception()
+        self.attack_chance = 0
+        self.thinks = 0      # Decisions made on the last AI tick
+        self.deferred = 0    # Enemies that kept their last decision instead
+
+    def run(self):
+        world = self.world
+        wave = world.current_wave
+        interval = think_interval(wave)
+        if world.tick % interval != 0:
+            return
+        balance = world.balance
+        self.attack_chance = min(balance.attack_chance_base + wave * balance.attack_chance_per_wave,
+                                 balance.attack_chance_max)
+        speed_factor = min(balance.speed_factor_base + wave * balance.speed_factor_per_wave,
+                           balance.speed_factor_max)
+        living = [e for e in world.enemies if not e.dead]
+        crowded = len(world.enemies) > 1
+        if crowded:
+            world.index.rebuild(living)
+        self.seen.update(world.player)
+        start, end = think_window(living, balance.ai_budget, world.tick // interval)
+        self.thinks = end - start
+        self.deferred = len(living) - self.thinks
+
+        index = world.index
+        for i, enemy in enumerate(living):
+            if start <= i < end:
+                enemy.ai_move = BEHAVIORS[enemy.behavior].think(self, enemy, self.seen.x - enemy.x)
+            direction = enemy.ai_move
+            if direction == 0:
+                continue
+            # Don't walk into the back of another enemy that is already
+            # closer to the player
+            if crowded and (index.between(enemy.x, enemy.x + ENEMY_SPACING) if direction > 0
+                            else index.between(enemy.x - ENEMY_SPACING, enemy.x)):
+                continue
+            enemy.move(direction * enemy.speed * speed_factor)
+
+    def roll(self):
+        return self.world.rng.random() < self.attack_chance
+
+    def swing(self, enemy):
+        # The swing chance grows with the wave
+        if self.roll():
+            enemy.attack()
+            self.record(ATTACK, 0, enemy.combo_count)
+
+    def spin(self, enemy):
+        if self.roll():
+            enemy.aerial_attack()
+            self.record(ATTACK, SPIN, 0)
+            return True
+        return False
+
+    def dash(self, enemy, direction):
+        if not enemy.is_dashing and enemy.dash_cooldown <= 0:
+            enemy.dash(direction)
+            self.record(DASH, 0, direction)
+
+    def record(self, kind, flags, count):
+        events = self.world.events
+        if events is not None:
+            events.append((self.world.tick, kind, ENEMY, flags, count, 0))
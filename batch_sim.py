@@ -0,0 +1,293 @@
+import numpy as np
+
+from combat import ATTACK_RANGE, SPIN_RANGE
+from main import (Balance, GROUND_Y, WIDTH, INPUT_LEFT, INPUT_RIGHT, INPUT_ATTACK,
+                  INPUT_JUMP, INPUT_AERIAL, INPUT_DASH)
+
+# Vectorized lockstep simulation of many independent matches. Fighter state
+# is held struct-of-arrays style (one NumPy array per Stickman attribute,
+# one element per match) and the rules of World.step, Stickman.update and
+# Stickman.take_damage are applied to every match at once with masks.
+#
+# Only gameplay state is simulated; particles, slashes and dash trails are
+# purely cosmetic and are skipped. Spawns and AI rolls draw from one NumPy
+# generator, so results follow the same distributions as World but are not
+# bit-identical to a World run with the same seed. Each match has exactly
+# one enemy at a time and it always chases; the Balance.wave_size_*,
+# *_share and ai_budget fields are ignored, except that aerial_share turns
+# on enemy spin damage as it does in World.
+
+# Stickman constants
+JUMP_POWER = -15
+GRAVITY = 0.8
+DASH_SPEED = 15
+DASH_DURATION = 10
+DASH_COOLDOWN_MAX = 30
+MAX_COMBO = 3
+COMBO_WINDOW = 30
+ATTACK_FRAMES = 6
+MIN_X = 50
+MAX_X = WIDTH - 50
+
+
+class Fighters:
+    # One Stickman per match
+    def __init__(self, n):
+        self.x = np.zeros(n)
+        self.y = np.zeros(n)
+        self.vel_y = np.zeros(n)
+        self.speed = np.zeros(n)
+        self.health = np.zeros(n)
+        self.facing_right = np.zeros(n, dtype=bool)
+        self.dead = np.zeros(n, dtype=bool)
+        self.attacking = np.zeros(n, dtype=bool)
+        self.attack_frame = np.zeros(n, dtype=np.int32)
+        self.hit_cooldown = np.zeros(n, dtype=np.int32)
+        self.combo_count = np.zeros(n, dtype=np.int32)
+        self.combo_timer = np.zeros(n, dtype=np.int32)
+        self.is_jumping = np.zeros(n, dtype=bool)
+        self.is_dashing = np.zeros(n, dtype=bool)
+        self.dash_duration = np.zeros(n, dtype=np.int32)
+        self.dash_cooldown = np.zeros(n, dtype=np.int32)
+        self.dash_direction = np.ones(n, dtype=np.int32)
+        self.spinning = np.zeros(n, dtype=bool)
+        self.spin_angle = np.zeros(n, dtype=np.int32)
+
+    def spawn(self, mask, x, facing_right, speed=5, health=100):
+        # Equivalent of Stickman(x, facing_right) for the masked matches
+        self.x[mask] = x
+        self.y[mask] = GROUND_Y
+        self.vel_y[mask] = 0
+        self.speed[mask] = speed
+        self.health[mask] = health
+        self.facing_right[mask] = facing_right
+        for name in ('dead', 'attacking', 'is_jumping', 'is_dashing', 'spinning'):
+            getattr(self, name)[mask] = False
+        for name in ('attack_frame', 'hit_cooldown', 'combo_count', 'combo_timer',
+                     'dash_cooldown', 'spin_angle'):
+            getattr(self, name)[mask] = 0
+        self.dash_duration[mask] = DASH_DURATION
+        self.dash_direction[mask] = 1
+
+    def move(self, mask, dx):
+        mask = mask & ~self.dead
+        dx = np.where(self.is_dashing, DASH_SPEED * self.dash_direction, dx)
+        self.x[mask] = np.clip(self.x[mask] + dx[mask], MIN_X, MAX_X)
+        turned = mask & (dx != 0)
+        self.facing_right[turned] = dx[turned] > 0
+
+    def jump(self, mask):
+        mask = mask & ~self.dead & ~self.is_jumping
+        self.vel_y[mask] = JUMP_POWER
+        self.is_jumping[mask] = True
+
+    def dash(self, mask, direction):
+        mask = mask & ~self.dead & ~self.is_dashing & (self.dash_cooldown <= 0)
+        self.is_dashing[mask] = True
+        self.dash_duration[mask] = DASH_DURATION
+        self.dash_direction[mask] = direction[mask]
+        self.dash_cooldown[mask] = DASH_COOLDOWN_MAX
+
+    def attack(self, mask):
+        mask = mask & ~self.dead & ~self.attacking
+        self.attacking[mask] = True
+        self.attack_frame[mask] = 0
+        in_window = mask & (self.combo_timer > 0)
+        self.combo_count[in_window] = (self.combo_count[in_window] + 1) % MAX_COMBO
+        self.combo_count[mask & ~in_window] = 0
+        self.combo_timer[mask] = COMBO_WINDOW
+
+    def aerial_attack(self, mask):
+        mask = mask & ~self.dead & ~self.attacking & ~self.spinning & ~self.is_dashing
+        self.is_jumping[mask] = True
+        self.spinning[mask] = True
+        self.vel_y[mask] = JUMP_POWER
+        self.spin_angle[mask] = 0
+
+    def take_damage(self, mask, amount):
+        # Returns the damage actually dealt per match
+        mask = mask & (self.hit_cooldown <= 0)
+        blocking = ~self.facing_right
+        dealt = np.where(mask, np.where(blocking, amount * 0.5, amount), 0.0)
+        self.health -= dealt
+        self.hit_cooldown[mask] = np.where(blocking[mask], 45, 30)
+        killed = mask & (self.health <= 0)
+        self.health[killed] = 0
+        self.dead[killed] = True
+        return dealt
+
+    def update(self, mask):
+        attacking = mask & self.attacking
+        self.attack_frame[attacking] += 1
+        finished = attacking & (self.attack_frame >= ATTACK_FRAMES)
+        self.attacking[finished] = False
+        self.attack_frame[finished] = 0
+
+        self.hit_cooldown[mask & (self.hit_cooldown > 0)] -= 1
+        self.combo_timer[mask & (self.combo_timer > 0)] -= 1
+
+        dashing = mask & self.is_dashing
+        self.dash_duration[dashing] -= 1
+        self.is_dashing[dashing & (self.dash_duration <= 0)] = False
+        self.dash_cooldown[mask & (self.dash_cooldown > 0)] -= 1
+
+        alive = mask & ~self.dead
+        self.vel_y[alive] += GRAVITY
+        self.y[alive] += self.vel_y[alive]
+        self.spin_angle[alive & self.spinning] += 20
+
+        landed = alive & (self.y > GROUND_Y)
+        self.y[landed] = GROUND_Y
+        self.vel_y[landed] = 0
+        self.is_jumping[landed] = False
+        self.spinning[landed] = False
+        self.spin_angle[landed] = 0
+
+
+def apply_input(fighters, active, buttons):
+    fighters.attack(active & (buttons & INPUT_ATTACK != 0))
+    fighters.jump(active & (buttons & INPUT_JUMP != 0))
+    fighters.aerial_attack(active & (buttons & INPUT_AERIAL != 0))
+    direction = np.where(buttons & INPUT_LEFT != 0, -1,
+                         np.where(buttons & INPUT_RIGHT != 0, 1,
+                                  np.where(fighters.facing_right, 1, -1)))
+    fighters.dash(active & (buttons & INPUT_DASH != 0), direction)
+
+
+def apply_movement(fighters, active, buttons):
+    fighters.move(active & (buttons & INPUT_LEFT != 0), -fighters.speed)
+    fighters.move(active & (buttons & INPUT_RIGHT != 0), fighters.speed)
+
+
+def unsupported_fields(balance):
+    # Names of the Balance fields set to something BatchWorld cannot
+    # reproduce: waves of more than one enemy, or non-chasing behaviors
+    names = []
+    if (int(min(balance.wave_size_base, balance.wave_size_max)) != 1 or
+            (balance.wave_size_per_wave and balance.wave_size_max > 1)):
+        names += ['wave_size_base', 'wave_size_per_wave', 'wave_size_max']
+    names += [name for name in ('kite_share', 'dash_in_share', 'aerial_share') if getattr(balance, name)]
+    return names
+
+
+class BatchWorld:
+    # N independent matches stepped in lockstep. Per-match results are kept
+    # alongside the fighters: wave, score, ticks survived and damage totals.
+    def __init__(self, n, seed=None, balance=None):
+        self.n = n
+        self.balance = balance if balance is not None else Balance()
+        self.rng = np.random.default_rng(seed)
+        self.player = Fighters(n)
+        self.enemy = Fighters(n)
+        self.current_wave = np.zeros(n, dtype=np.int32)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.tick = np.zeros(n, dtype=np.int64)
+        self.damage_dealt = np.zeros(n)
+        self.damage_taken = np.zeros(n)
+        self.reset()
+
+    @property
+    def game_over(self):
+        return self.player.dead
+
+    def reset(self, mask=None):
+        # Restart the masked matches (all of them by default)
+        if mask is None:
+            mask = np.ones(self.n, dtype=bool)
+        self.player.spawn(mask, 100, True)
+        self.enemy.spawn(mask, WIDTH - 100, False, speed=self.balance.enemy_base_speed)
+        self.current_wave[mask] = 1
+        self.score[mask] = 0
+        self.tick[mask] = 0
+        self.damage_dealt[mask] = 0
+        self.damage_taken[mask] = 0
+
+    def spawn_enemies(self, mask):
+        if not mask.any():
+            return
+        self.score[mask] += 100 * self.current_wave[mask]
+        self.current_wave[mask] += 1
+        balance = self.balance
+        wave = self.current_wave[mask]
+        count = len(wave)
+        left = self.rng.random(count) < 0.5
+        spawn_x = np.where(left,
+                           self.rng.integers(50, WIDTH//3 + 1, count),
+                           self.rng.integers(2*WIDTH//3, WIDTH - 50 + 1, count))
+        self.enemy.spawn(mask, spawn_x, left,
+                         speed=np.minimum(balance.enemy_base_speed + wave * balance.enemy_speed_per_wave,
+                                          balance.enemy_max_speed),
+                         health=100 + wave * balance.enemy_health_per_wave)
+
+    def run_enemy_ai(self, active):
+        player, enemy, wave = self.player, self.enemy, self.current_wave
+        balance = self.balance
+        thinking = active & ~enemy.dead & (self.tick % np.maximum(3 - wave//10, 2) == 0)
+        distance = np.abs(player.x - enemy.x)
+        in_range = thinking & (distance < ATTACK_RANGE) & ~enemy.attacking
+        rolls = self.rng.random(self.n)
+        chance = np.minimum(balance.attack_chance_base + wave * balance.attack_chance_per_wave,
+                            balance.attack_chance_max)
+        enemy.attack(in_range & (rolls < chance))
+        chasing = thinking & ~in_range
+        step = enemy.speed * np.minimum(balance.speed_factor_base + wave * balance.speed_factor_per_wave,
+                                        balance.speed_factor_max)
+        # Both directions are decided before either move, like the if/elif
+        # in World.run_enemy_ai
+        left = chasing & (player.x < enemy.x)
+        right = chasing & (player.x > enemy.x)
+        enemy.move(left, -step)
+        enemy.move(right, step)
+
+    def check_hits(self, active):
+        player, enemy = self.player, self.enemy
+        distance = np.abs(player.x - enemy.x)
+        swing = active & player.attacking & (player.attack_frame == 3) & (distance < ATTACK_RANGE)
+        self.damage_dealt += enemy.take_damage(swing, 20)
+        spin = active & player.spinning & (distance < SPIN_RANGE)
+        self.damage_dealt += enemy.take_damage(spin, 35)
+        enemy_swing = active & enemy.attacking & (enemy.attack_frame == 3) & (distance < ATTACK_RANGE)
+        balance = self.balance
+        amount = balance.enemy_damage_base + np.minimum(self.current_wave * balance.enemy_damage_per_wave,
+                                                        balance.enemy_damage_max)
+        self.damage_taken += player.take_damage(enemy_swing, amount)
+        if balance.aerial_share:
+            # As World.enemy_spin_damage: spins only hurt with aerial enemies
+            enemy_spin = active & enemy.spinning & ~enemy.dead & (distance < SPIN_RANGE)
+            self.damage_taken += player.take_damage(enemy_spin, amount * balance.enemy_spin_damage_scale)
+
+    def step(self, player_inputs=0, enemy_inputs=None, mask=None):
+        # Inputs are per-match bitmask arrays (or one bitmask for all);
+        # enemy_inputs=None runs the built-in AI in every match. Matches
+        # outside `mask` are left untouched.
+        player_inputs = np.broadcast_to(np.asarray(player_inputs, dtype=np.uint8), (self.n,))
+        selected = np.ones(self.n, dtype=bool) if mask is None else mask
+        active = selected & ~self.player.dead
+        apply_input(self.player, active, player_inputs)
+        if enemy_inputs is not None:
+            enemy_inputs = np.broadcast_to(np.asarray(enemy_inputs, dtype=np.uint8), (self.n,))
+            apply_input(self.enemy, active, enemy_inputs)
+
+        apply_movement(self.player, active, player_inputs)
+        self.spawn_enemies(active & self.enemy.dead)
+
+        if enemy_inputs is None:
+            self.run_enemy_ai(active)
+        else:
+            apply_movement(self.enemy, active, enemy_inputs)
+
+        self.check_hits(active)
+        self.player.update(active)
+        self.enemy.update(active)
+        self.tick[active] += 1
+
+    def run(self, max_ticks, player_controller=None, enemy_controller=None):
+        # Step until every match is over or has run max_ticks. Controllers
+        # take the batch and return per-match input arrays.
+        while True:
+            running = ~self.game_over & (self.tick < max_ticks)
+            if not running.any():
+                return self.tick
+            player_inputs = player_controller(self) if player_controller else 0
+            enemy_inputs = enemy_controller(self) if enemy_controller else None
+            self.step(player_inputs, enemy_inputs, running)
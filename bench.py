@@ -0,0 +1,257 @@
+import os
+
+# Benchmarks render offscreen through SDL's dummy driver
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+import pygame
+
+from bots import chaser, toward_enemy
+from hud import Hud
+from main import (Background, Corpse, DirtyRenderer, GRAY, GROUND_Y, HEIGHT, WIDTH, INPUT_AERIAL,
+                  INPUT_DASH, INPUT_LEFT, INPUT_RIGHT, World, draw_scene, draw_world)
+
+# Benchmark suite. Each scenario scripts a World headlessly and is measured
+# three ways:
+#
+#   sim     ticks/sec of World.step alone
+#   render  frames/sec of draw_world + display.flip alone (the simulation
+#           still runs between frames but is not timed); render_dirty is
+#           the same through DirtyRenderer and display.update
+#   alloc   peak and retained Python heap while the scenario runs, via
+#           tracemalloc (run separately since tracing slows everything)
+#
+# Results can be saved as a baseline and later runs fail (exit status 1)
+# when a metric regresses by more than the tolerance.
+#
+#   python bench.py --save-baseline     # record bench_baseline.json
+#   python bench.py                     # compare against it
+
+DEFAULT_BASELINE = 'bench_baseline.json'
+
+
+class Scenario:
+    # setup(world) prepares a freshly reset world; controller(world) returns
+    # the player input for each tick and may also poke the world directly.
+    # Worlds that reach game over are reset and set up again.
+    def __init__(self, name, controller, setup=None):
+        self.name = name
+        self.controller = controller
+        self.setup = setup
+
+    def new_world(self, seed):
+        world = World(seed)
+        self.prepare(world)
+        return world
+
+    def prepare(self, world):
+        if self.setup is not None:
+            self.setup(world)
+
+    def step(self, world):
+        if world.game_over:
+            world.reset(world.seed)
+            self.prepare(world)
+        world.step(self.controller(world))
+
+
+def idle(world):
+    return 0
+
+
+def spin_spam(world):
+    return toward_enemy(world) | INPUT_AERIAL
+
+
+def long_dash_trail(world):
+    # No dash cooldown, so the player dashes back and forth continuously
+    world.player.dash_cooldown_max = 0
+
+
+def dash_spam(world):
+    # Alternate dashing toward and away from the enemy every half second
+    direction = toward_enemy(world)
+    if world.tick % 60 < 30:
+        direction = INPUT_LEFT if direction == INPUT_RIGHT else INPUT_RIGHT
+    return direction | INPUT_DASH
+
+
+def late_wave(world, wave=500):
+    # Jump to a late wave with a full history of corpses behind it
+    world.current_wave = wave
+    world.corpses = [Corpse(50 + (i * 37) % (WIDTH - 100), GROUND_Y, 50, i % 2 == 0)
+                     for i in range(wave - 1)]
+    world.enemy.health = 100 + wave * world.balance.enemy_health_per_wave
+
+
+def particle_storm(world):
+    for fighter in (world.player, world.enemy):
+        fighter.particles.emit(fighter.x, fighter.y - fighter.size, GRAY, 12,
+                               size=(2, 4), speed=(1, 6), lifetime=60)
+    return chaser(world)
+
+
+SCENARIOS = {s.name: s for s in [
+    Scenario('idle', idle),
+    Scenario('spin', spin_spam),
+    Scenario('dash', dash_spam, long_dash_trail),
+    Scenario('wave500', chaser, late_wave),
+    Scenario('particles', particle_storm),
+]}
+
+
+def bench_sim(scenario, ticks, seed):
+    world = scenario.new_world(seed)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        scenario.step(world)
+    return ticks / (time.perf_counter() - start)
+
+
+def bench_render(scenario, frames, seed, screen, hud):
+    world = scenario.new_world(seed)
+    background = Background()
+    elapsed = 0.0
+    for _ in range(frames):
+        scenario.step(world)
+        start = time.perf_counter()
+        draw_world(screen, world, background, hud)
+        pygame.display.flip()
+        elapsed += time.perf_counter() - start
+    return frames / elapsed
+
+
+def bench_render_dirty(scenario, frames, seed, screen, hud):
+    world = scenario.new_world(seed)
+    renderer = DirtyRenderer(Background())
+    elapsed = 0.0
+    for _ in range(frames):
+        scenario.step(world)
+        start = time.perf_counter()
+        restored = renderer.restore(screen, world.corpses)
+        renderer.present(restored, draw_scene(screen, world, hud))
+        elapsed += time.perf_counter() - start
+    return frames / elapsed
+
+
+def bench_alloc(scenario, ticks, seed, screen, hud):
+    world = scenario.new_world(seed)
+    background = Background()
+    # Warm caches first so steady-state churn is what gets measured
+    for _ in range(60):
+        scenario.step(world)
+        draw_world(screen, world, background, hud)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(ticks):
+        scenario.step(world)
+        draw_world(screen, world, background, hud)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'alloc_peak_kb': (peak - before) / 1024, 'alloc_retained_kb': (current - before) / 1024}
+
+
+def run(names, ticks, frames, alloc_ticks, seed, repeat=3):
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    hud = Hud(pygame.font.Font(None, 36))
+    results = {}
+    for name in names:
+        scenario = SCENARIOS[name]
+        # Best of `repeat` runs; the fastest run is the least disturbed one
+        result = {
+            'sim_ticks_per_sec': max(bench_sim(scenario, ticks, seed) for _ in range(repeat)),
+            'render_fps': max(bench_render(scenario, frames, seed, screen, hud) for _ in range(repeat)),
+            'render_dirty_fps': max(bench_render_dirty(scenario, frames, seed, screen, hud)
+                                    for _ in range(repeat)),
+        }
+        result.update(bench_alloc(scenario, alloc_ticks, seed, screen, hud))
+        results[name] = result
+        print(f'{name:<10} sim {result["sim_ticks_per_sec"]:>10.0f} ticks/s   '
+              f'render {result["render_fps"]:>8.0f} fps   '
+              f'dirty {result["render_dirty_fps"]:>8.0f} fps   '
+              f'alloc peak {result["alloc_peak_kb"]:>8.1f} KiB   '
+              f'retained {result["alloc_retained_kb"]:>7.1f} KiB')
+    pygame.quit()
+    return results
+
+
+# Throughput must not drop, memory must not grow, beyond the tolerance.
+# Memory gets a small absolute allowance since tiny baselines are noisy.
+HIGHER_IS_BETTER = ('sim_ticks_per_sec', 'render_fps', 'render_dirty_fps')
+LOWER_IS_BETTER = ('alloc_peak_kb', 'alloc_retained_kb')
+ALLOC_SLACK_KB = 64
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric in HIGHER_IS_BETTER:
+            if metric in base and result[metric] < base[metric] * (1 - tolerance):
+                regressions.append(f'{name}.{metric}: {result[metric]:.0f} < baseline {base[metric]:.0f}')
+        for metric in LOWER_IS_BETTER:
+            if metric in base and result[metric] > base[metric] * (1 + tolerance) + ALLOC_SLACK_KB:
+                regressions.append(f'{name}.{metric}: {result[metric]:.1f} > baseline {base[metric]:.1f}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Stickman Fight benchmark suite.')
+    parser.add_argument('scenarios', nargs='*', metavar='SCENARIO',
+                        help=f'scenarios to run: {", ".join(SCENARIOS)} (default: all)')
+    parser.add_argument('--ticks', type=int, default=5000, help='ticks for the simulation benchmark')
+    parser.add_argument('--frames', type=int, default=600, help='frames for the render benchmark')
+    parser.add_argument('--alloc-ticks', type=int, default=300, help='ticks traced for allocations')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per benchmark; the best is kept')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed relative regression before failing (default: 0.2)')
+    parser.add_argument('--json', metavar='PATH', help='also write results to PATH')
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f'unknown scenario: {", ".join(unknown)}')
+    names = args.scenarios or list(SCENARIOS)
+    results = run(names, args.ticks, args.frames, args.alloc_ticks, args.seed, args.repeat)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print(f'baseline saved to {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'no baseline at {args.baseline}; run with --save-baseline to create one')
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print(f'REGRESSION {line}', file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
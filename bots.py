@@ -0,0 +1,51 @@
+from combat import ATTACK_RANGE, SPIN_RANGE
+from main import (INPUT_LEFT, INPUT_RIGHT, INPUT_ATTACK, INPUT_JUMP,
+                  INPUT_AERIAL, INPUT_DASH)
+
+# Scripted player controllers for headless matches. Each takes a World and
+# returns the player's input bitmask for the next tick.
+
+
+def toward_enemy(world):
+    return INPUT_RIGHT if world.enemy.x > world.player.x else INPUT_LEFT
+
+
+def idle(world):
+    return 0
+
+
+def chaser(world):
+    # Walk at the enemy and swing whenever it is in reach
+    buttons = toward_enemy(world)
+    if abs(world.enemy.x - world.player.x) < ATTACK_RANGE:
+        buttons |= INPUT_ATTACK
+    return buttons
+
+
+def spinner(world):
+    # Close in and open with aerial spins, falling back to regular swings
+    buttons = toward_enemy(world)
+    if abs(world.enemy.x - world.player.x) < SPIN_RANGE:
+        buttons |= INPUT_AERIAL | INPUT_ATTACK
+    return buttons
+
+
+def dasher(world):
+    # Dash in from range, then swing; hop over the enemy every so often
+    buttons = toward_enemy(world)
+    distance = abs(world.enemy.x - world.player.x)
+    if distance > ATTACK_RANGE:
+        buttons |= INPUT_DASH
+    else:
+        buttons |= INPUT_ATTACK
+        if world.tick % 90 == 0:
+            buttons |= INPUT_JUMP
+    return buttons
+
+
+BOTS = {
+    'idle': idle,
+    'chaser': chaser,
+    'spinner': spinner,
+    'dasher': dasher,
+}
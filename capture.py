@@ -0,0 +1,268 @@
+import os
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import queue
+import struct
+import sys
+import threading
+import time
+import zlib
+
+import numpy as np
+import pygame
+
+from hud import Hud
+from main import FRAME_MS, HEIGHT, WIDTH, Background, World, draw_world
+from replay import Replay, ReplayError
+
+# Gameplay video capture. The game loop calls FrameCapture.capture(screen)
+# after each flip; that only copies the frame's pixels into one of a fixed
+# ring of preallocated buffers and queues it. A background thread converts
+# queued frames to RGB, packs several into a chunk, optionally compresses it
+# with zlib and appends it to the file. If every buffer is still waiting on
+# the writer the frame is dropped and counted; the loop never blocks.
+#
+#   header   magic b'SMCP', version u8, width u16, height u16, compression u8
+#   chunks   frame count u16, payload size u32, frame numbers (u32 each),
+#            then the payload: the chunk's frames as rgb24, top row first,
+#            zlib-compressed unless compression is RAW
+#
+# Frame numbers count every frame offered to capture(), so gaps show where
+# frames were dropped (drops after the last stored frame leave no trace;
+# FrameCapture.stats() has the full counts). Stored replays can also be
+# rendered straight to a capture file without a display, as fast as the
+# machine allows:
+#
+#   python capture.py render match.rep -o match.smc
+#   python capture.py info match.smc
+#   python capture.py export match.smc --raw | ffmpeg -f rawvideo -pix_fmt rgb24 \
+#       -s 800x400 -r 60 -i - match.mp4
+
+MAGIC = b'SMCP'
+VERSION = 1
+HEADER = struct.Struct('<4sBHHB')
+CHUNK = struct.Struct('<HI')
+RAW, ZLIB = 0, 1
+
+DEFAULT_PATH = 'capture.smc'
+SLOTS = 8            # Frames that can wait for the writer before drops start
+CHUNK_FRAMES = 8     # Frames per chunk
+ZLIB_LEVEL = 1       # Fast; frames are mostly flat white and compress well anyway
+
+# Channel shifts of pygame.image.tobytes(surface, 'RGBX') read as uint32
+RGBX_SHIFTS = (0, 8, 16) if sys.byteorder == 'little' else (24, 16, 8)
+
+
+class FrameCapture:
+    _CLOSE = object()
+
+    def __init__(self, path=DEFAULT_PATH, size=(WIDTH, HEIGHT), compress=True,
+                 slots=SLOTS, chunk_frames=CHUNK_FRAMES):
+        self.path = path
+        self.size = size
+        self.compression = ZLIB if compress else RAW
+        self.chunk_frames = chunk_frames
+        # One uint32 per pixel, rows first like the surface's own memory
+        width, height = size
+        self.ring = [np.empty((height, width), dtype=np.uint32) for _ in range(slots)]
+        self.free = queue.Queue()
+        for slot in range(slots):
+            self.free.put(slot)
+        self.queue = queue.Queue()
+        self.frames = 0     # Frames offered
+        self.captured = 0
+        self.dropped = 0
+        self.written = 0
+        self.bytes_written = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, width, height, self.compression))
+        self.thread = threading.Thread(target=self.run, name='capture', daemon=True)
+        self.thread.start()
+
+    def capture(self, surface, block=False):
+        # Called from the game loop after a flip. With block=True (offline
+        # rendering) waits for a free buffer instead of dropping the frame.
+        if surface.get_size() != self.size:
+            raise ValueError(f'surface is {surface.get_size()}, capture is {self.size}')
+        number = self.frames
+        self.frames += 1
+        try:
+            slot = self.free.get(block)
+        except queue.Empty:
+            self.dropped += 1
+            return False
+        buffer = self.ring[slot]
+        if surface.get_bytesize() == 4:
+            # A straight copy of the mapped pixels; channels are split out
+            # on the writer thread
+            pixels = pygame.surfarray.pixels2d(surface)
+            np.copyto(buffer.T, pixels)
+            del pixels  # Unlocks the surface
+            shifts = surface.get_shifts()[:3]
+        else:
+            buffer.view(np.uint8).reshape(-1)[:] = np.frombuffer(
+                pygame.image.tobytes(surface, 'RGBX'), dtype=np.uint8)
+            shifts = RGBX_SHIFTS
+        self.queue.put((number, slot, shifts))
+        self.captured += 1
+        return True
+
+    def close(self):
+        # Write out everything queued so far and stop the thread
+        self.queue.put(self._CLOSE)
+        self.thread.join()
+
+    def stats(self):
+        return {'frames': self.frames, 'captured': self.captured, 'dropped': self.dropped,
+                'written': self.written, 'bytes': self.bytes_written}
+
+    def run(self):
+        numbers = []
+        frames = []
+        while True:
+            item = self.queue.get()
+            if item is self._CLOSE:
+                break
+            number, slot, shifts = item
+            buffer = self.ring[slot]
+            rgb = np.empty(buffer.shape + (3,), dtype=np.uint8)
+            for channel, shift in enumerate(shifts):
+                rgb[..., channel] = buffer >> shift
+            self.free.put(slot)
+            numbers.append(number)
+            frames.append(rgb.tobytes())
+            if len(frames) >= self.chunk_frames:
+                self.write_chunk(numbers, frames)
+                numbers = []
+                frames = []
+        if frames:
+            self.write_chunk(numbers, frames)
+        self.file.close()
+
+    def write_chunk(self, numbers, frames):
+        payload = b''.join(frames)
+        if self.compression == ZLIB:
+            payload = zlib.compress(payload, ZLIB_LEVEL)
+        data = (CHUNK.pack(len(numbers), len(payload)) +
+                struct.pack(f'<{len(numbers)}I', *numbers) + payload)
+        self.file.write(data)
+        self.file.flush()
+        self.written += len(numbers)
+        self.bytes_written += len(data)
+
+
+def read_capture(path):
+    # Returns ((width, height), frames) where frames yields (number, rgb24
+    # bytes) per stored frame; a chunk cut short by a crash is ignored
+    f = open(path, 'rb')
+    header = f.read(HEADER.size)
+    if len(header) < HEADER.size or HEADER.unpack(header)[:2] != (MAGIC, VERSION):
+        f.close()
+        raise ValueError(f'{path}: not a capture file')
+    _, _, width, height, compression = HEADER.unpack(header)
+    frame_size = width * height * 3
+
+    def frames():
+        with f:
+            while True:
+                head = f.read(CHUNK.size)
+                if len(head) < CHUNK.size:
+                    return
+                count, size = CHUNK.unpack(head)
+                numbers = f.read(4 * count)
+                payload = f.read(size)
+                if len(payload) < size:
+                    return
+                if compression == ZLIB:
+                    payload = zlib.decompress(payload)
+                for i, number in enumerate(struct.unpack(f'<{count}I', numbers)):
+                    yield number, payload[i * frame_size:(i + 1) * frame_size]
+
+    return (width, height), frames()
+
+
+def render_replay(replay, path, compress=True, every=1):
+    # Re-simulate a replay and draw every `every`th tick into a capture file
+    # at full speed. Needs no display: everything is drawn on an offscreen
+    # surface, and the run cycle follows game time instead of the clock.
+    pygame.font.init()
+    surface = pygame.Surface((WIDTH, HEIGHT))
+    background = Background()
+    hud = Hud(pygame.font.Font(None, 36))
+    world = World(replay.seed)
+    capture = FrameCapture(path, (WIDTH, HEIGHT), compress)
+    enemy_inputs = replay.enemy_inputs or [None] * len(replay.inputs)
+    for player_input, enemy_input in zip(replay.inputs, enemy_inputs):
+        world.step(player_input, enemy_input)
+        if world.tick % every == 0 or world.game_over:
+            draw_world(surface, world, background, hud, ms=world.tick * FRAME_MS)
+            capture.capture(surface, block=True)
+    capture.close()
+    return world, capture
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Record and read Stickman Fight frame captures.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    render = commands.add_parser('render', help='render a replay into a capture file, without a display')
+    render.add_argument('replay')
+    render.add_argument('-o', '--output', default=DEFAULT_PATH, help=f'default: {DEFAULT_PATH}')
+    render.add_argument('--every', type=int, default=1, metavar='N', help='keep every Nth tick')
+    render.add_argument('--raw', action='store_true', help='store frames uncompressed')
+    info = commands.add_parser('info', help='summarize a capture file')
+    info.add_argument('file')
+    export = commands.add_parser('export', help='extract frames from a capture file')
+    export.add_argument('file')
+    target = export.add_mutually_exclusive_group(required=True)
+    target.add_argument('--png', metavar='DIR', help='write each frame as DIR/frame_NNNNNN.png')
+    target.add_argument('--raw', action='store_true', help='write rgb24 frames to stdout')
+    args = parser.parse_args(argv)
+
+    if args.command == 'render':
+        try:
+            replay = Replay.load(args.replay)
+        except (OSError, ReplayError) as e:
+            print(f'{args.replay}: {e}', file=sys.stderr)
+            return 1
+        start = time.perf_counter()
+        world, capture = render_replay(replay, args.output, not args.raw, args.every)
+        elapsed = time.perf_counter() - start
+        print(f'{args.output}: {capture.written} frames of {world.tick} ticks in {elapsed:.2f}s '
+              f'({capture.written / elapsed:.0f} fps, {world.tick * FRAME_MS / 1000 / elapsed:.1f}x '
+              f'real time), {capture.bytes_written} bytes')
+        return 0
+
+    try:
+        (width, height), frames = read_capture(args.file)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    if args.command == 'info':
+        count = 0
+        gaps = 0
+        last = -1
+        for number, _ in frames:
+            count += 1
+            gaps += number - last - 1
+            last = number
+        print(f'{args.file}: {width}x{height}, {count} frames, {gaps} dropped')
+    elif args.png:
+        os.makedirs(args.png, exist_ok=True)
+        for number, data in frames:
+            image = pygame.image.frombuffer(data, (width, height), 'RGB')
+            pygame.image.save(image, os.path.join(args.png, f'frame_{number:06d}.png'))
+    else:
+        out = sys.stdout.buffer
+        for _, data in frames:
+            out.write(data)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
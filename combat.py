@@ -0,0 +1,6 @@
+# Reach of each attack, measured along x between the attacker's and the
+# target's feet. World and BatchWorld both apply them; the enemy AI (ai.py)
+# and every scripted bot (bots.py, netplay.py) aim with the same numbers.
+
+ATTACK_RANGE = 80   # Regular swings
+SPIN_RANGE = 100    # Aerial spins reach further
@@ -0,0 +1,66 @@
+import pygame
+
+# HUD text that is only rasterized when its value changes. The wave and
+# score change once per kill, so rendering them with font.render every frame
+# was wasted work.
+
+TEXT_COLOR = (0, 0, 0)
+
+# Frame cap while the game-over screen is up; it is static, so this only
+# bounds input latency for the restart key
+GAME_OVER_FPS = 15
+
+# Events after which the window contents must be redrawn
+REPAINT_EVENTS = {pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED}
+
+
+class CachedText:
+    def __init__(self, font, template, color=TEXT_COLOR):
+        self.font = font
+        self.template = template
+        self.color = color
+        self.value = None
+        self.surface = None
+
+    def render(self, value):
+        if self.surface is None or value != self.value:
+            self.value = value
+            self.surface = self.font.render(self.template.format(value), True, self.color)
+        return self.surface
+
+    def draw(self, surface, value, **position):
+        # position takes the same keywords as Rect attributes, e.g. topleft=(10, 10)
+        text = self.render(value)
+        rect = text.get_rect(**position)
+        surface.blit(text, rect)
+        return rect
+
+
+class Hud:
+    # Wave and score counters in the top-left corner
+    def __init__(self, font):
+        self.wave = CachedText(font, 'Wave: {}')
+        self.score = CachedText(font, 'Score: {}')
+
+    def draw(self, surface, wave, score):
+        return [self.wave.draw(surface, wave, topleft=(10, 10)),
+                self.score.draw(surface, score, topleft=(10, 50))]
+
+
+class GameOverScreen:
+    # Drawn once when the match ends and again only if the window needs
+    # repainting; the loop idles at GAME_OVER_FPS meanwhile
+    def __init__(self, font):
+        self.title = CachedText(font, 'Game Over - Wave: {}')
+        self.score = CachedText(font, 'Final Score: {}')
+        self.restart = font.render('Press SPACE to restart', True, TEXT_COLOR)
+        self.shown = False
+
+    def draw(self, surface, wave, score, background=(255, 255, 255)):
+        width, height = surface.get_size()
+        surface.fill(background)
+        self.title.draw(surface, wave, center=(width/2, height/2 - 40))
+        self.score.draw(surface, score, center=(width/2, height/2))
+        surface.blit(self.restart, self.restart.get_rect(center=(width/2, height/2 + 40)))
+        self.shown = True
+
@@ -1,16 +1,43 @@
+import os
+import time
+
+# Taken before anything heavy is imported, for the startup timer
+STARTED = time.perf_counter()
+# Importing pygame should not print to stdout for tools that import this module
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
 import pygame
+import argparse
 import sys
 import math
-import random  # For enemy AI randomization
+import random  # Seeds for per-match RNGs
+import struct
+from array import array
+from collections import namedtuple
+from operator import attrgetter
+
+import numpy as np
 
-# Initialize Pygame
-pygame.init()
+from hud import GAME_OVER_FPS, REPAINT_EVENTS, GameOverScreen, Hud
+from ai import CHASE, EnemyAI, pick_behavior
+from combat import ATTACK_RANGE, SPIN_RANGE
+from particles import ParticlePool
+from poses import draw_pose, pose_key, pose_sprites, pose_table
+from profiler import NULL_PROFILER, FrameProfiler, world_counters
+from quality import HIGH, TIER_NAMES, QualityGovernor
+from spatial import AxisIndex
+from startup import Preloader, StartupTimer
+from sprites import quantize_alpha, sprite_cache
+from telemetry import ATTACK, BLOCKED, DASH, DEATH, ENEMY, HIT, PLAYER, SPIN, WAVE
 
-# Set up the display
+# Display size (the window itself is only created in main(), so the
+# simulation below can be imported and stepped without a display)
 WIDTH = 800
 HEIGHT = 400
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Stickman Fight")
+
+# Game time per simulation tick, for animating offscreen renders by tick
+# rather than by the wall clock
+FRAME_MS = 1000 / 60
 
 # Colors
 WHITE = (255, 255, 255)
@@ -20,36 +47,11 @@ BLUE = (0, 100, 255)
 GRAY = (128, 128, 128)
 SILVER = (192, 192, 192)
 
-# Particle system
-class Particle:
-    def __init__(self, x, y, color, size=2, speed=2, lifetime=30):
-        self.x = x
-        self.y = y
-        self.color = color
-        self.size = size
-        self.lifetime = lifetime
-        self.max_lifetime = lifetime
-        # Random direction
-        angle = random.uniform(0, math.pi * 2)
-        self.vx = math.cos(angle) * speed
-        self.vy = math.sin(angle) * speed - 1  # Slight upward bias
-        
-    def update(self):
-        self.x += self.vx
-        self.y += self.vy
-        self.vy += 0.1  # Gravity
-        self.lifetime -= 1
-        return self.lifetime > 0
-        
-    def draw(self, surface):
-        alpha = int(255 * (self.lifetime / self.max_lifetime))
-        s = pygame.Surface((self.size*2, self.size*2), pygame.SRCALPHA)
-        pygame.draw.circle(s, (*self.color, alpha), (self.size, self.size), self.size)
-        surface.blit(s, (int(self.x - self.size), int(self.y - self.size)))
-
-
 # Slash effect class
 class SlashEffect:
+    __slots__ = ('x', 'y', 'angle', 'size', 'base_color', 'alpha', 'fade_speed', 'lines', 'sprite',
+                 'glow')
+
     def __init__(self, x, y, angle, size, color):
         self.x = x
         self.y = y
@@ -59,6 +61,8 @@ class SlashEffect:
         self.alpha = 255
         self.fade_speed = 25
         self.lines = self.generate_lines()
+        self.sprite = None
+        self.glow = True
 
     def generate_lines(self):
         lines = []
@@ -79,29 +83,52 @@ class SlashEffect:
         self.alpha -= self.fade_speed
         return self.alpha > 0
 
-    def draw(self, surface):
-        # Create a surface for the slash with alpha channel
-        slash_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        
-        for start, end in self.lines:
-            # Main line
-            color = (*self.base_color, self.alpha)
-            pygame.draw.line(slash_surface, color, start, end, 2)
-            
-            # Subtle glow
-            glow_color = (*self.base_color, self.alpha // 3)
-            pygame.draw.line(slash_surface, glow_color, start, end, 4)
-        
-        surface.blit(slash_surface, (0, 0))
+    def draw(self, surface, glow=True):
+        # Blit a cached bounding-box sprite of the lines, faded to our alpha
+        if self.sprite is None or glow != self.glow:
+            relative = [((sx - self.x, sy - self.y), (ex - self.x, ey - self.y))
+                        for (sx, sy), (ex, ey) in self.lines]
+            self.sprite = sprite_cache.slash(relative, self.base_color, glow)
+            self.glow = glow
+        slash_surface, (left, top) = self.sprite
+        slash_surface.set_alpha(quantize_alpha(self.alpha))
+        return surface.blit(slash_surface, (int(self.x + left), int(self.y + top)))
 
 # Ground position
 GROUND_Y = HEIGHT - 50
 
+# Stickman height in pixels
+FIGHTER_SIZE = 50
+
+def draw_corpse(surface, x, y, size, facing_right):
+    # Draw fallen stickman
+    return pose_sprites.blit(surface, size, ('dead', facing_right), x, y)
+
+# Packed fighter state, see Stickman.pack(). Every gameplay attribute goes
+# into one fixed-size record, followed by the cosmetic effects: slash count
+# and trail dot count, the slashes, the trail dots, then the particle pool.
+FIGHTER_FLOATS = ('x', 'y', 'vel_y', 'health', 'speed', 'jump_power', 'gravity', 'dash_speed',
+                  'weapon_angle')
+FIGHTER_INTS = ('attack_frame', 'hit_cooldown', 'combo_count', 'combo_timer', 'dash_duration',
+                'dash_cooldown', 'dash_cooldown_max', 'dash_direction', 'spin_angle', 'size', 'max_combo',
+                'behavior', 'ai_move')
+FIGHTER_FLAGS = ('facing_right', 'attacking', 'dead', 'is_jumping', 'is_dashing', 'spinning')
+FIGHTER_FIELDS = FIGHTER_FLOATS + FIGHTER_INTS + FIGHTER_FLAGS
+FIGHTER_STATE = struct.Struct(f'<{len(FIGHTER_FLOATS)}d{len(FIGHTER_INTS)}h{len(FIGHTER_FLAGS)}?')
+EFFECT_COUNTS = struct.Struct('<HH')
+SLASH_STATE = struct.Struct('<4d3Bh')   # x, y, angle, size, color, alpha
+TRAIL_STATE = struct.Struct('<2dh')     # x, y, alpha
+_fighter_fields = attrgetter(*FIGHTER_FIELDS)
+
 class Stickman:
-    def __init__(self, x, facing_right=True):
+    # Slotted, since hordes and rollback keep many of these around
+    __slots__ = FIGHTER_FIELDS + ('slash_effects', 'particles', 'dash_trail')
+    use_pose_sprites = True  # Blit cached per-pose sprites instead of drawing lines
+
+    def __init__(self, x, facing_right=True, effects_rng=None):
         self.x = x
         self.y = GROUND_Y
-        self.size = 50
+        self.size = FIGHTER_SIZE
         self.speed = 5
         self.facing_right = facing_right
         self.attacking = False
@@ -114,7 +141,7 @@ class Stickman:
         self.combo_timer = 0
         self.max_combo = 3
         self.slash_effects = []
-        self.particles = []  # For smoke effects
+        self.particles = ParticlePool(rng=effects_rng)  # Blood and smoke effects
         # New movement mechanics
         self.vel_y = 0
         self.is_jumping = False
@@ -126,150 +153,66 @@ class Stickman:
         self.dash_cooldown_max = 30
         self.is_dashing = False
         self.dash_direction = 1
-        self.dash_trail = []
+        self.dash_trail = []  # (x, y, alpha) per dot
         # Aerial attack
         self.spinning = False
         self.spin_angle = 0
+        # Enemy AI: index into ai.BEHAVIORS and the last decided direction
+        self.behavior = CHASE
+        self.ai_move = 0
+
+    def draw(self, surface, quality=HIGH, ms=None):
+        return self.draw_effects(surface, quality) + self.draw_body(surface, ms)
 
-    def draw(self, surface):
+    # The draw methods return the rectangles they touched, which the
+    # dirty-rect renderer uses to update only those parts of the screen.
+    # `quality` is a quality.QualityTier thinning out the effects.
+    def draw_effects(self, surface, quality=HIGH):
+        rects = []
         # Draw dash trail
-        for trail in self.dash_trail:
-            alpha = min(trail['alpha'], 255)
-            trail_color = (100, 200, 255, alpha)
-            trail_surface = pygame.Surface((10, 10), pygame.SRCALPHA)
-            pygame.draw.circle(trail_surface, trail_color, (5, 5), 5)
-            surface.blit(trail_surface, (trail['x'] - 5, trail['y'] - 5))
-            
-        # Flash white when hit (invulnerability frames)
-        draw_color = (255, 255, 255, 128) if self.hit_cooldown > 0 else BLACK
-        
+        if quality.trail_step > 0:
+            for x, y, alpha in self.dash_trail[::quality.trail_step]:
+                trail_surface = sprite_cache.circle(5, (100, 200, 255), min(alpha, 255))
+                rects.append(surface.blit(trail_surface, (x - 5, y - 5)))
+
         # Draw particles
-        for particle in self.particles:
-            particle.draw(surface)
+        particles = self.particles.draw(surface, quality.particle_step)
+        if particles is not None:
+            rects.append(particles)
         
         # Draw slash effects
         for effect in self.slash_effects:
-            effect.draw(surface)
-            
+            rects.append(effect.draw(surface, quality.slash_glow))
+        return rects
+
+    def draw_body(self, surface, ms=None):
+        # The pose (including the white hit flash while spinning) comes from
+        # a cached sprite unless use_pose_sprites is turned off. The run
+        # cycle follows `ms`, by default the time since pygame started.
         if self.dead:
-            self.draw_dead(surface)
-            return
+            return [self.draw_dead(surface)]
 
-        if self.spinning:
-            # Calculate rotated points for spinning animation
-            angle = math.radians(self.spin_angle)
-            cos_a = math.cos(angle)
-            sin_a = math.sin(angle)
-            
-            # Rotate points around center
-            def rotate_point(x, y):
-                rx = (x - self.x) * cos_a - (y - (self.y - self.size//2)) * sin_a + self.x
-                ry = (x - self.x) * sin_a + (y - (self.y - self.size//2)) * cos_a + (self.y - self.size//2)
-                return (rx, ry)
-            
-            # Draw rotated stickman
-            # Head
-            head_pos = rotate_point(self.x, self.y - self.size)
-            pygame.draw.circle(surface, BLACK, head_pos, self.size // 4, 2)
-            
-            # Body
-            body_start = rotate_point(self.x, self.y - self.size + self.size//4)
-            body_end = rotate_point(self.x, self.y - self.size//2)
-            pygame.draw.line(surface, draw_color, body_start, body_end, 2)
-            
-            # Legs
-            leg1_end = rotate_point(self.x - self.size//4, self.y)
-            leg2_end = rotate_point(self.x + self.size//4, self.y)
-            pygame.draw.line(surface, draw_color, body_end, leg1_end, 2)
-            pygame.draw.line(surface, draw_color, body_end, leg2_end, 2)
-            
-            # Arms and spinning sword
-            arm_pos = rotate_point(self.x, self.y - self.size + self.size//3)
-            weapon_length = self.size * 1.5  # Longer sword for spin attack
-            weapon_angle = angle + (math.pi/4 if self.facing_right else -math.pi/4)
-            weapon_end = (
-                arm_pos[0] + math.cos(weapon_angle) * weapon_length,
-                arm_pos[1] + math.sin(weapon_angle) * weapon_length
-            )
-            
-            # Draw the spinning sword
-            pygame.draw.line(surface, draw_color, arm_pos, weapon_end, 3)
-            
+        key = pose_key(self, pygame.time.get_ticks() if ms is None else ms)
+        if self.use_pose_sprites:
+            body = pose_sprites.blit(surface, self.size, key, self.x, self.y)
         else:
-            # Normal stickman drawing
-            # Draw head
-            pygame.draw.circle(surface, BLACK, (self.x, self.y - self.size), self.size // 4, 2)
-
-            # Draw body
-            pygame.draw.line(surface, BLACK, (self.x, self.y - self.size + self.size//4),
-                            (self.x, self.y - self.size//2), 2)
-
-            # Draw legs with running animation if moving
-            leg_offset = math.sin(pygame.time.get_ticks() * 0.01) * 10 if abs(self.speed) > 0 else 0
-            pygame.draw.line(surface, BLACK, (self.x, self.y - self.size//2),
-                            (self.x - self.size//4 + leg_offset, self.y), 2)
-            pygame.draw.line(surface, BLACK, (self.x, self.y - self.size//2),
-                            (self.x + self.size//4 - leg_offset, self.y), 2)
-
-            # Draw arms and weapon
-            if self.attacking:
-                # Attack animation
-                weapon_length = self.size * 1.2
-                if self.facing_right:
-                    arm_angle = -45 + self.attack_frame * 15
-                    weapon_start = (self.x + self.size//4, self.y - self.size + self.size//3)
-                    weapon_end = (weapon_start[0] + math.cos(math.radians(arm_angle)) * weapon_length,
-                                weapon_start[1] + math.sin(math.radians(arm_angle)) * weapon_length)
-                else:
-                    arm_angle = 225 - self.attack_frame * 15
-                    weapon_start = (self.x - self.size//4, self.y - self.size + self.size//3)
-                    weapon_end = (weapon_start[0] + math.cos(math.radians(arm_angle)) * weapon_length,
-                                weapon_start[1] + math.sin(math.radians(arm_angle)) * weapon_length)
-
-                # Draw weapon
-                pygame.draw.line(surface, BLACK, weapon_start, weapon_end, 3)
-
-                # Draw arms in attack position
-                pygame.draw.line(surface, BLACK, (self.x, self.y - self.size + self.size//3),
-                               weapon_start, 2)
-            else:
-                # Normal arm position
-                arm_offset = math.sin(pygame.time.get_ticks() * 0.01) * 5
-                pygame.draw.line(surface, BLACK, (self.x, self.y - self.size + self.size//3),
-                               (self.x - self.size//4, self.y - self.size//1.5 + arm_offset), 2)
-                pygame.draw.line(surface, BLACK, (self.x, self.y - self.size + self.size//3),
-                               (self.x + self.size//4, self.y - self.size//1.5 - arm_offset), 2)
+            body = draw_pose(surface, pose_table(self.size), key, self.x, self.y)
 
         # Draw health bar
         health_width = 40
         health_height = 5
         health_x = self.x - health_width//2
         health_y = self.y - self.size - 30
-        pygame.draw.rect(surface, RED, (health_x, health_y, health_width, health_height), 1)
-        pygame.draw.rect(surface, RED, (health_x, health_y, health_width * (self.health/100), health_height))
+        bar = pygame.draw.rect(surface, RED, (health_x, health_y, health_width, health_height), 1)
+        fill = pygame.draw.rect(surface, RED, (health_x, health_y, health_width * (self.health/100), health_height))
+        return [body, bar.union(fill)]
 
     def draw_dead(self, surface):
-        # Draw fallen stickman
-        if self.facing_right:
-            # Body
-            pygame.draw.line(surface, BLACK, (self.x - self.size//2, self.y),
-                           (self.x + self.size//2, self.y), 2)
-            # Head
-            pygame.draw.circle(surface, BLACK, (self.x + self.size//2, self.y), self.size//4, 2)
-            # Legs
-            pygame.draw.line(surface, BLACK, (self.x - self.size//2, self.y),
-                           (self.x - self.size//4, self.y - self.size//4), 2)
-            pygame.draw.line(surface, BLACK, (self.x - self.size//2, self.y),
-                           (self.x - self.size//4, self.y + self.size//4), 2)
-        else:
-            # Mirror image when facing left
-            pygame.draw.line(surface, BLACK, (self.x - self.size//2, self.y),
-                           (self.x + self.size//2, self.y), 2)
-            pygame.draw.circle(surface, BLACK, (self.x - self.size//2, self.y), self.size//4, 2)
-            pygame.draw.line(surface, BLACK, (self.x + self.size//2, self.y),
-                           (self.x + self.size//4, self.y - self.size//4), 2)
-            pygame.draw.line(surface, BLACK, (self.x + self.size//2, self.y),
-                           (self.x + self.size//4, self.y + self.size//4), 2)
+        return draw_corpse(surface, self.x, self.y, self.size, self.facing_right)
+
+    def has_effects(self):
+        # True while particles, slashes or dash trail are still animating
+        return bool(len(self.particles) or self.slash_effects or self.dash_trail)
 
     def move(self, dx):
         if not self.dead:
@@ -281,11 +224,7 @@ class Stickman:
             
             # Add trail effect when dashing
             if self.is_dashing and not self.dead:
-                self.dash_trail.append({
-                    'x': self.x,
-                    'y': self.y,
-                    'alpha': 255
-                })
+                self.dash_trail.append((self.x, self.y, 255))
     
     def jump(self):
         if not self.dead and not self.is_jumping:
@@ -362,21 +301,20 @@ class Stickman:
             self.hit_cooldown = 45 if not self.facing_right else 30
             
             # Create blood particles
-            for _ in range(8):
-                # Blood particles shoot out in the direction of the hit
-                angle = random.uniform(-math.pi/4, math.pi/4)  # Spread angle
-                speed = random.uniform(3, 6)
-                self.particles.append(Particle(
-                    self.x, self.y - self.size/2,
-                    (200, 0, 0),  # Dark red color
-                    size=random.randint(2, 3),
-                    speed=speed,
-                    lifetime=40
-                ))
+            self.particles.emit(
+                self.x, self.y - self.size/2,
+                (200, 0, 0),  # Dark red color
+                8,
+                size=(2, 3),
+                speed=(3, 6),
+                lifetime=40
+            )
             
             if self.health <= 0:
                 self.health = 0
                 self.dead = True
+            return amount
+        return 0
 
     def update(self):
         if self.attacking:
@@ -401,9 +339,7 @@ class Stickman:
             self.dash_cooldown -= 1
             
         # Update dash trail
-        for trail in self.dash_trail:
-            trail['alpha'] -= 15
-        self.dash_trail = [t for t in self.dash_trail if t['alpha'] > 0]
+        self.dash_trail = [(x, y, alpha - 15) for x, y, alpha in self.dash_trail if alpha > 15]
             
         # Apply gravity and update position
         if not self.dead:
@@ -427,169 +363,779 @@ class Stickman:
                     self.spinning = False
                     self.spin_angle = 0
                     # Create smoke particles on landing
-                    for _ in range(10):
-                        self.particles.append(Particle(self.x, GROUND_Y, GRAY, 
-                                                    size=random.randint(2,4),
-                                                    speed=random.uniform(2,4)))
+                    self.particles.emit(self.x, GROUND_Y, GRAY, 10,
+                                        size=(2, 4), speed=(2, 4))
             
         # Update slash effects and particles
         self.slash_effects = [effect for effect in self.slash_effects if effect.update()]
-        self.particles = [p for p in self.particles if p.update()]
+        self.particles.update()
 
-def reset_game():
-    player = Stickman(100, True)
-    enemy = Stickman(WIDTH - 100, False)
+    def pack(self):
+        # The whole fighter as bytes; the first FIGHTER_STATE.size bytes are
+        # the gameplay state, the rest is cosmetic
+        parts = [FIGHTER_STATE.pack(*_fighter_fields(self)),
+                 EFFECT_COUNTS.pack(len(self.slash_effects), len(self.dash_trail))]
+        parts += [SLASH_STATE.pack(e.x, e.y, e.angle, e.size, *e.base_color, e.alpha)
+                  for e in self.slash_effects]
+        parts += [TRAIL_STATE.pack(*dot) for dot in self.dash_trail]
+        parts.append(self.particles.pack())
+        return b''.join(parts)
+
+    def unpack(self, data, offset=0):
+        # Overwrite this fighter from pack() output at `offset`; returns the
+        # offset after it
+        for name, value in zip(FIGHTER_FIELDS, FIGHTER_STATE.unpack_from(data, offset)):
+            setattr(self, name, value)
+        offset += FIGHTER_STATE.size
+        slashes, dots = EFFECT_COUNTS.unpack_from(data, offset)
+        offset += EFFECT_COUNTS.size
+        self.slash_effects = []
+        for _ in range(slashes):
+            x, y, angle, size, r, g, b, alpha = SLASH_STATE.unpack_from(data, offset)
+            effect = SlashEffect(x, y, angle, size, (r, g, b))
+            effect.alpha = alpha
+            self.slash_effects.append(effect)
+            offset += SLASH_STATE.size
+        self.dash_trail = [TRAIL_STATE.unpack_from(data, offset + i * TRAIL_STATE.size) for i in range(dots)]
+        offset += dots * TRAIL_STATE.size
+        return self.particles.unpack(data, offset)
+
+def reset_game(effects_rng=None):
+    player = Stickman(100, True, effects_rng)
+    enemy = Stickman(WIDTH - 100, False, effects_rng)
     enemy.speed = 5  # Base speed
     return player, enemy, [], 1, 0  # Returns player, enemy, dead_enemies, current_wave, score
 
-def main():
+# A defeated enemy whose effects have finished only needs its resting pose
+# for drawing, so it is reduced to one of these and the Stickman released
+Corpse = namedtuple('Corpse', ['x', 'y', 'size', 'facing_right'])
+
+# Input record for one tick: a bitmask of held directions plus the action
+# buttons pressed this tick
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_ATTACK = 4
+INPUT_JUMP = 8
+INPUT_AERIAL = 16
+INPUT_DASH = 32
+
+def apply_input(fighter, buttons):
+    # Discrete actions first (they were KEYDOWN events in the original loop)
+    if buttons & INPUT_ATTACK:
+        fighter.attack()
+    if buttons & INPUT_JUMP:
+        fighter.jump()
+    if buttons & INPUT_AERIAL:
+        fighter.aerial_attack()
+    if buttons & INPUT_DASH:
+        # Dash in the direction the fighter is moving or facing
+        if buttons & INPUT_LEFT:
+            fighter.dash(-1)
+        elif buttons & INPUT_RIGHT:
+            fighter.dash(1)
+        else:
+            fighter.dash(1 if fighter.facing_right else -1)
+
+def apply_movement(fighter, buttons):
+    if buttons & INPUT_LEFT:
+        fighter.move(-fighter.speed)
+    if buttons & INPUT_RIGHT:
+        fighter.move(fighter.speed)
+
+# Wave scaling constants. Defaults are the shipped game balance; pass a
+# modified copy (Balance()._replace(...)) to World for balance sweeps.
+Balance = namedtuple('Balance', [
+    'enemy_base_speed',       # Enemy speed at wave 0
+    'enemy_speed_per_wave',
+    'enemy_max_speed',
+    'enemy_health_per_wave',  # On top of the base 100 HP
+    'attack_chance_base',     # Chance the AI swings when in range
+    'attack_chance_per_wave',
+    'attack_chance_max',
+    'speed_factor_base',      # Fraction of its speed the AI chases with
+    'speed_factor_per_wave',
+    'speed_factor_max',
+    'enemy_damage_base',
+    'enemy_damage_per_wave',
+    'enemy_damage_max',       # Cap on the per-wave bonus
+    'wave_size_base',         # Enemies spawned together per wave
+    'wave_size_per_wave',
+    'wave_size_max',
+    'kite_share',             # Fractions of enemies spawned with each
+    'dash_in_share',          # non-chasing behavior, see ai.py
+    'aerial_share',
+    'enemy_spin_damage_scale',  # Enemy spin damage over a swing's, with aerial enemies only
+    'ai_budget',              # AI decision cost allowed per AI tick, 0 for no limit
+], defaults=[5, 0.25, 8, 5, 0.3, 0.02, 0.6, 0.25, 0.05, 0.75, 6, 0.3, 4, 1, 0, 1, 0, 0, 0, 1.5, 0])
+
+# Horde mode: waves grow by two enemies each, up to a few hundred on screen,
+# with the AI's decisions spread over several ticks once there are many
+HORDE_BALANCE = Balance(wave_size_per_wave=2, wave_size_max=300, ai_budget=64)
+
+# Mixed behaviors on top of another balance, see --mixed
+BEHAVIOR_MIX = {'kite_share': 0.25, 'dash_in_share': 0.25, 'aerial_share': 0.2}
+
+WorldState = namedtuple('WorldState', [
+    'tick', 'current_wave', 'score', 'damage_dealt', 'damage_taken',
+    'rng', 'effects_rng',                   # Packed RNG states
+    'player', 'enemies', 'dead_enemies',    # Stickman.pack() output
+    'corpses',                              # Tuple of Corpse records
+])
+
+# World.to_bytes() layout: header, balance, both RNG states, then the player,
+# enemies and dead enemies as counted, length-prefixed Stickman.pack()
+# records, and finally the corpses
+WORLD_MAGIC = b'SMWS'
+WORLD_VERSION = 2   # 2: AI behavior fields in fighters and balance
+WORLD_HEADER = struct.Struct('<4sBQIIQdd')  # magic, version, seed, tick, wave, score, damage dealt/taken
+SEED_LIMIT = 2**64  # Seeds are stored as u64 here, in replays and in netplay
+BALANCE_STATE = struct.Struct(f'<{len(Balance._fields)}d')
+CORPSE_STATE = struct.Struct('<ddh?')
+COUNT = struct.Struct('<I')
+
+# random.Random state: the 624-word Mersenne Twister state plus position,
+# then the cached gauss value
+MT_WORDS = 625
+GAUSS_STATE = struct.Struct('<?d')
+RANDOM_STATE_SIZE = MT_WORDS * 4 + GAUSS_STATE.size
+# NumPy PCG64 state: 128-bit state and increment, buffered 32-bit half
+GENERATOR_STATE = struct.Struct('<16s16sBI')
+
+def pack_random_state(rng):
+    _, words, gauss = rng.getstate()
+    return array('I', words).tobytes() + GAUSS_STATE.pack(gauss is not None, gauss or 0.0)
+
+def unpack_random_state(rng, data):
+    words = array('I')
+    words.frombytes(data[:MT_WORDS * 4])
+    has_gauss, gauss = GAUSS_STATE.unpack_from(data, MT_WORDS * 4)
+    rng.setstate((3, tuple(words), gauss if has_gauss else None))
+
+def pack_generator_state(generator):
+    state = generator.bit_generator.state
+    return GENERATOR_STATE.pack(state['state']['state'].to_bytes(16, 'little'),
+                                state['state']['inc'].to_bytes(16, 'little'),
+                                state['has_uint32'], state['uinteger'])
+
+def unpack_generator_state(generator, data):
+    value, inc, has_uint32, uinteger = GENERATOR_STATE.unpack(data)
+    generator.bit_generator.state = {
+        'bit_generator': 'PCG64',
+        'state': {'state': int.from_bytes(value, 'little'), 'inc': int.from_bytes(inc, 'little')},
+        'has_uint32': has_uint32,
+        'uinteger': uinteger,
+    }
+
+def parse_seed(text):
+    # argparse type for --seed options
+    seed = int(text)
+    if not 0 <= seed < SEED_LIMIT:
+        raise argparse.ArgumentTypeError(f'seed must be in 0..{SEED_LIMIT - 1}')
+    return seed
+
+class World:
+    # Headless match simulation. step() advances the player, the enemies, the
+    # wave counter and the score by exactly one tick and never touches the
+    # display, so matches can be run without a window and without a frame cap.
+    # All gameplay randomness comes from a per-match RNG seeded by `seed`, so
+    # the same seed and inputs always reproduce the same match.
+    #
+    # A wave is one or more enemies (see Balance.wave_size_*); hit detection
+    # and AI neighbor queries go through an AxisIndex over their x positions.
+    def __init__(self, seed=None, balance=None):
+        self.balance = balance if balance is not None else Balance()
+        self.index = AxisIndex()
+        self.ai = EnemyAI(self)
+        self.events = None  # Set to a list to collect match events, see telemetry.py
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        # A new match; without an explicit seed one is drawn so that the
+        # match can still be recorded and replayed
+        if seed is not None and not 0 <= seed < SEED_LIMIT:
+            raise ValueError(f'seed must be in 0..{SEED_LIMIT - 1}, got {seed}')
+        self.seed = seed if seed is not None else random.getrandbits(63)
+        self.rng = random.Random(self.seed)
+        # Cosmetic randomness (particle spray) has its own stream so that
+        # effects never perturb gameplay rolls
+        self.effects_rng = np.random.default_rng(self.seed)
+        self.player, enemy, self.dead_enemies, self.current_wave, self.score = reset_game(self.effects_rng)
+        enemy.speed = self.balance.enemy_base_speed
+        enemy.behavior = pick_behavior(self.balance, self.rng)
+        self.enemies = [enemy]
+        self.corpses = []  # Finished dead enemies, oldest first
+        self.tick = 0
+        self.damage_dealt = 0
+        self.damage_taken = 0
+
+    @property
+    def game_over(self):
+        return self.player.dead
+
+    # snapshot() captures everything step() reads or changes as a WorldState
+    # of immutable values (fighters and RNGs packed to bytes), so it is
+    # cheap to take, hold and restore() many times, into this world or any
+    # other. Corpses are kept as a tuple of their immutable records; restore()
+    # trims or extends the corpse list in place when it shares a history with
+    # the snapshot, which lets Background keep its baked layer, and replaces
+    # it otherwise. to_bytes()/from_bytes() serialize a complete match.
+    def snapshot(self):
+        return WorldState(self.tick, self.current_wave, self.score, self.damage_dealt, self.damage_taken,
+                          pack_random_state(self.rng), pack_generator_state(self.effects_rng),
+                          self.player.pack(), [e.pack() for e in self.enemies],
+                          [e.pack() for e in self.dead_enemies], tuple(self.corpses))
+
+    def restore(self, state):
+        (self.tick, self.current_wave, self.score,
+         self.damage_dealt, self.damage_taken) = state[:5]
+        unpack_random_state(self.rng, state.rng)
+        unpack_generator_state(self.effects_rng, state.effects_rng)
+        self.player.unpack(state.player)
+        # Reuse the current enemy objects (and their particle arrays)
+        spare = list(dict.fromkeys(self.enemies + self.dead_enemies))
+        self.enemies = [self.restore_fighter(spare, data) for data in state.enemies]
+        self.dead_enemies = [self.restore_fighter(spare, data) for data in state.dead_enemies]
+        common = min(len(self.corpses), len(state.corpses))
+        if tuple(self.corpses[:common]) == state.corpses[:common]:
+            del self.corpses[len(state.corpses):]
+            self.corpses.extend(state.corpses[common:])
+        else:
+            self.corpses = list(state.corpses)
+
+    def restore_fighter(self, spare, data):
+        fighter = spare.pop() if spare else Stickman(0, effects_rng=self.effects_rng)
+        fighter.unpack(data)
+        return fighter
+
+    def to_bytes(self):
+        state = self.snapshot()
+        parts = [WORLD_HEADER.pack(WORLD_MAGIC, WORLD_VERSION, self.seed, self.tick, self.current_wave,
+                                   self.score, self.damage_dealt, self.damage_taken),
+                 BALANCE_STATE.pack(*self.balance), state.rng, state.effects_rng]
+        for group in ([state.player], state.enemies, state.dead_enemies):
+            parts.append(COUNT.pack(len(group)))
+            for data in group:
+                parts += [COUNT.pack(len(data)), data]
+        parts.append(COUNT.pack(len(self.corpses)))
+        parts += [CORPSE_STATE.pack(*corpse) for corpse in self.corpses]
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        try:
+            magic, version, seed, tick, wave, score, dealt, taken = WORLD_HEADER.unpack_from(data)
+            if magic != WORLD_MAGIC:
+                raise ValueError('not a saved match')
+            if version != WORLD_VERSION:
+                raise ValueError(f'unsupported saved match version {version}')
+            offset = WORLD_HEADER.size
+            balance = Balance(*(int(v) if v.is_integer() else v
+                                for v in BALANCE_STATE.unpack_from(data, offset)))
+            offset += BALANCE_STATE.size
+            rng = data[offset:offset + RANDOM_STATE_SIZE]
+            offset += RANDOM_STATE_SIZE
+            effects_rng = data[offset:offset + GENERATOR_STATE.size]
+            offset += GENERATOR_STATE.size
+            groups = []
+            for _ in range(3):
+                (count,) = COUNT.unpack_from(data, offset)
+                offset += COUNT.size
+                group = []
+                for _ in range(count):
+                    (size,) = COUNT.unpack_from(data, offset)
+                    offset += COUNT.size
+                    group.append(data[offset:offset + size])
+                    offset += size
+                groups.append(group)
+            (count,) = COUNT.unpack_from(data, offset)
+            offset += COUNT.size
+            corpses = tuple(Corpse(*CORPSE_STATE.unpack_from(data, offset + i * CORPSE_STATE.size))
+                            for i in range(count))
+        except struct.error:
+            raise ValueError('truncated saved match')
+        world = cls(seed, balance)
+        world.restore(WorldState(tick, wave, score, dealt, taken, rng, effects_rng,
+                                 groups[0][0], groups[1], groups[2], corpses))
+        return world
+
+    @property
+    def enemy(self):
+        # The living enemy nearest the player; once a whole wave is down,
+        # the last one killed until the next wave spawns
+        living = [e for e in self.enemies if not e.dead]
+        if not living:
+            return self.enemies[-1]
+        if len(living) == 1:
+            return living[0]
+        return min(living, key=lambda e: abs(e.x - self.player.x))
+
+    def wave_size(self):
+        balance = self.balance
+        return int(min(balance.wave_size_base + (self.current_wave - 1) * balance.wave_size_per_wave,
+                       balance.wave_size_max))
+
+    def retire_dead_enemies(self):
+        # Score each kill, and start the next wave once everyone is down
+        living = []
+        for enemy in self.enemies:
+            if enemy.dead:
+                self.dead_enemies.append(enemy)
+                self.score += 100 * self.current_wave  # More points for higher waves
+            else:
+                living.append(enemy)
+        self.enemies = living
+        if not living:
+            self.current_wave += 1
+            self.enemies = [self.spawn_enemy() for _ in range(self.wave_size())]
+            if self.events is not None:
+                self.events.append((self.tick, WAVE, PLAYER, 0, len(self.enemies), self.current_wave))
+
+    def spawn_enemy(self):
+        # Create new enemy with increased stats and random spawn
+        spawn_side = self.rng.choice(['left', 'right'])
+        if spawn_side == 'left':
+            spawn_x = self.rng.randint(50, WIDTH//3)  # Left third of screen
+            facing_right = True
+        else:
+            spawn_x = self.rng.randint(2*WIDTH//3, WIDTH-50)  # Right third of screen
+            facing_right = False
+
+        enemy = Stickman(spawn_x, facing_right, self.effects_rng)
+        balance = self.balance
+        # More gradual speed increase
+        enemy.speed = min(balance.enemy_base_speed + self.current_wave * balance.enemy_speed_per_wave,
+                          balance.enemy_max_speed)
+        # More gradual health increase
+        enemy.health = 100 + (self.current_wave * balance.enemy_health_per_wave)
+        enemy.behavior = pick_behavior(balance, self.rng)
+        return enemy
+
+    def run_enemy_ai(self):
+        # Enemy AI - gets more aggressive with each wave, see ai.py
+        self.ai.run()
+
+    def check_hits(self):
+        player = self.player
+        if len(self.enemies) == 1:
+            nearby = self.enemies
+        else:
+            self.index.rebuild(self.enemies)
+            nearby = self.index.within(player.x, SPIN_RANGE)  # Widest reach below
+
+        for enemy in nearby:
+            if enemy.dead:
+                continue
+            distance = abs(player.x - enemy.x)
+            if player.attacking and player.attack_frame == 3:
+                if distance < ATTACK_RANGE:
+                    # Regular attack damage
+                    self.damage_dealt += self.hit(enemy, 20, PLAYER, combo=player.combo_count)
+
+            # Aerial attack does more damage and has wider range
+            if player.spinning:
+                if distance < SPIN_RANGE:  # Larger hit range
+                    self.damage_dealt += self.hit(enemy, 35, PLAYER, SPIN)  # More damage
+
+        spin_damage = self.enemy_spin_damage()
+        for enemy in nearby:
+            if enemy.attacking and enemy.attack_frame == 3:
+                if abs(player.x - enemy.x) < ATTACK_RANGE:
+                    self.damage_taken += self.hit(player, self.enemy_damage(), ENEMY,
+                                                  combo=enemy.combo_count)
+
+            # Enemies with the aerial behavior spin too
+            if spin_damage and enemy.spinning and not enemy.dead:
+                if abs(player.x - enemy.x) < SPIN_RANGE:
+                    self.damage_taken += self.hit(player, spin_damage, ENEMY, SPIN)
+
+    def enemy_damage(self):
+        # Reduced base damage and slower scaling
+        base_damage = self.balance.enemy_damage_base
+        wave_damage = min(self.current_wave * self.balance.enemy_damage_per_wave,
+                          self.balance.enemy_damage_max)
+        return base_damage + wave_damage
+
+    def enemy_spin_damage(self):
+        # Enemy spins hit harder than swings, as the player's do, but only in
+        # matches that spawn aerial enemies. Elsewhere a spinning enemy (a
+        # netplay guest's, say) stays as harmless as it has always been.
+        if not self.balance.aerial_share:
+            return 0
+        return self.enemy_damage() * self.balance.enemy_spin_damage_scale
+
+    def hit(self, victim, amount, attacker, flags=0, combo=0):
+        # take_damage plus HIT/DEATH events; returns the damage dealt
+        dealt = victim.take_damage(amount)
+        if dealt and self.events is not None:
+            if dealt < amount:
+                flags |= BLOCKED
+            self.events.append((self.tick, HIT, attacker, flags, combo, dealt))
+            if victim.dead:
+                self.events.append((self.tick, DEATH, 1 - attacker, 0, self.current_wave, self.score))
+        return dealt
+
+    def record_actions(self, before):
+        # ATTACK/DASH events for swings, spins and dashes started by input;
+        # `before` holds (fighter, attacking, spinning, dashing) for the
+        # player, then the enemy
+        for actor, (fighter, was_attacking, was_spinning, was_dashing) in zip((PLAYER, ENEMY), before):
+            if fighter.attacking and not was_attacking:
+                self.events.append((self.tick, ATTACK, actor, 0, fighter.combo_count, 0))
+            if fighter.spinning and not was_spinning:
+                self.events.append((self.tick, ATTACK, actor, SPIN, 0, 0))
+            if fighter.is_dashing and not was_dashing:
+                self.events.append((self.tick, DASH, actor, 0, fighter.dash_direction, 0))
+
+    def step(self, player_input=0, enemy_input=None):
+        # enemy_input=None lets the built-in AI drive the enemies; passing a
+        # bitmask instead gives bot-vs-bot control of the player and the
+        # enemy returned by `enemy`
+        controlled = self.enemy if enemy_input is not None else None
+        if self.events is not None:
+            before = [(f, f.attacking, f.spinning, f.is_dashing) for f in (self.player, controlled)
+                      if f is not None]
+        apply_input(self.player, player_input)
+        if controlled is not None:
+            apply_input(controlled, enemy_input)
+        if self.events is not None:
+            self.record_actions(before)
+
+        if self.game_over:
+            return
+
+        apply_movement(self.player, player_input)
+
+        # Start the next wave once the current one is dead
+        if any(enemy.dead for enemy in self.enemies):
+            self.retire_dead_enemies()
+
+        if enemy_input is None:
+            self.run_enemy_ai()
+        else:
+            if controlled.dead:
+                controlled = self.enemy
+            apply_movement(controlled, enemy_input)
+
+        self.check_hits()
+        self.update_fighters()
+        self.tick += 1
+
+    def update_fighters(self):
+        self.player.update()
+        for enemy in self.enemies:
+            enemy.update()
+        self.update_dead_enemies()
+
+    def update_dead_enemies(self):
+        # Let blood and slashes on defeated enemies play out, then keep only
+        # their resting pose
+        still_animating = []
+        for dead_enemy in self.dead_enemies:
+            dead_enemy.update()
+            if dead_enemy.has_effects():
+                still_animating.append(dead_enemy)
+            else:
+                self.corpses.append(Corpse(dead_enemy.x, dead_enemy.y,
+                                           dead_enemy.size, dead_enemy.facing_right))
+        self.dead_enemies = still_animating
+
+    def run(self, max_ticks, player_controller=None, enemy_controller=None):
+        # Run until the player dies or max_ticks elapse. Controllers are
+        # callables taking the world and returning an input bitmask.
+        while self.tick < max_ticks and not self.game_over:
+            player_input = player_controller(self) if player_controller else 0
+            enemy_input = enemy_controller(self) if enemy_controller else None
+            self.step(player_input, enemy_input)
+        return self.tick
+
+class Background:
+    # Static layer with the ground line and every finished corpse baked in.
+    # New corpses are drawn onto it once; it is only rebuilt from scratch
+    # when invalidated (e.g. the world was reset).
+    def __init__(self, size=(WIDTH, HEIGHT)):
+        self.surface = pygame.Surface(size)
+        self.corpses = None
+        self.baked = 0
+
+    def invalidate(self):
+        self.corpses = None
+
+    def sync(self, corpses):
+        # Returns the rectangles of newly baked corpses, or None when the
+        # whole layer was rebuilt
+        rebuilt = corpses is not self.corpses or len(corpses) < self.baked
+        if rebuilt:
+            self.surface.fill(WHITE)
+            pygame.draw.line(self.surface, BLACK, (0, GROUND_Y), (WIDTH, GROUND_Y), 2)
+            self.corpses = corpses
+            self.baked = 0
+        baked = [draw_corpse(self.surface, corpse.x, corpse.y, corpse.size, corpse.facing_right)
+                 for corpse in corpses[self.baked:]]
+        self.baked = len(corpses)
+        return None if rebuilt else baked
+
+    def draw(self, surface, corpses):
+        self.sync(corpses)
+        surface.blit(self.surface, (0, 0))
+
+class DirtyRenderer:
+    # Optional alternative to redrawing and flipping the whole window every
+    # frame. Each frame restores only the regions drawn over last frame from
+    # the background layer, draws fighters, effects and HUD on top while
+    # collecting the rectangles they touched, and hands just those old and
+    # new rectangles to pygame.display.update.
+    MAX_RECTS = 200  # Beyond this a full repaint is cheaper
+
+    def __init__(self, background, size=(WIDTH, HEIGHT)):
+        self.background = background
+        self.bounds = pygame.Rect((0, 0), size)
+        self.drawn = []    # Rectangles drawn over the background last frame
+        self.full = True   # Repaint and flip the whole window next frame
+
+    def invalidate(self):
+        self.full = True
+
+    def restore(self, surface, corpses):
+        # Returns the restored rectangles, which also need presenting
+        baked = self.background.sync(corpses)
+        if baked is None or self.full or len(self.drawn) + len(baked) > self.MAX_RECTS:
+            surface.blit(self.background.surface, (0, 0))
+            self.full = True
+            return []
+        restored = self.drawn + baked
+        for rect in restored:
+            surface.blit(self.background.surface, rect, rect)
+        return restored
+
+    def present(self, restored, drawn):
+        self.drawn = [r.clip(self.bounds) for r in drawn if r is not None]
+        if self.full:
+            pygame.display.flip()
+            self.full = False
+        else:
+            pygame.display.update(restored + self.drawn)
+
+def draw_scene(surface, world, hud, profiler=NULL_PROFILER, quality=HIGH, ms=None):
+    # Draw enemies whose effects are still playing, then the current enemy
+    # and player, then the HUD (if any); returns the rectangles drawn
+    rects = []
+    for fighter in world.dead_enemies + world.enemies + [world.player]:
+        with profiler.phase('effects'):
+            rects += fighter.draw_effects(surface, quality)
+        with profiler.phase('draw'):
+            rects += fighter.draw_body(surface, ms)
+
+    # Draw wave number and score
+    if hud is not None:
+        with profiler.phase('hud'):
+            rects += hud.draw(surface, world.current_wave, world.score)
+    return rects
+
+def draw_world(surface, world, background, hud, profiler=NULL_PROFILER, quality=HIGH, ms=None):
+    # Draw ground and baked corpses, then everything else on top
+    with profiler.phase('draw'):
+        background.draw(surface, world.corpses)
+    return draw_scene(surface, world, hud, profiler, quality, ms)
+
+def read_input(events, keys):
+    buttons = 0
+    if keys[pygame.K_LEFT]:
+        buttons |= INPUT_LEFT
+    if keys[pygame.K_RIGHT]:
+        buttons |= INPUT_RIGHT
+    for event in events:
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_z:
+                buttons |= INPUT_ATTACK
+            elif event.key == pygame.K_SPACE:
+                buttons |= INPUT_JUMP
+            elif event.key == pygame.K_x:
+                buttons |= INPUT_AERIAL
+            elif event.key == pygame.K_LSHIFT:
+                buttons |= INPUT_DASH
+    return buttons
+
+def main(seed=None, record_path=None, profile_path=None, balance=None, dirty_rects=False,
+         telemetry_path=None, startup_time=False, quality='auto', capture_path=None):
+    # Only the subsystems the game uses; pygame.init() would also open the
+    # audio device and probe joysticks
+    timer = StartupTimer(STARTED)
+    timer.mark('imported')
+    pygame.display.init()
+    pygame.font.init()
+    timer.mark('initialized')
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Stickman Fight")
     clock = pygame.time.Clock()
-    
-    # Initialize game state
-    player, enemy, dead_enemies, current_wave, score = reset_game()
+    timer.mark('window')
+
+    # Initialize game state and put the opening frame, without the HUD, on
+    # screen; fonts and fighter poses then load in the background while the
+    # rest is set up and the first ticks run
+    world = World(seed, balance)
+    background = Background()
+    draw_world(screen, world, background, None)
+    pygame.display.flip()
+    timer.mark('first_frame')
+    preloader = Preloader(FIGHTER_SIZE)
+    preloader.start()
+    renderer = DirtyRenderer(background) if dirty_rects else None
+
+    # Effect quality follows the measured frame time unless pinned to a tier
+    governor = QualityGovernor()
+    if quality != 'auto':
+        governor.set_tier(quality)
+
+    # Optional replay recording; each match is written to its own file
+    # (see replay.match_path) when it ends
+    replay = None
+    if record_path:
+        from replay import Replay, match_path
+        replay = Replay(world.seed)
+        match_number = 1
+
+    # Optional frame profiler with on-screen overlay; dumped on exit
+    profiler = FrameProfiler() if profile_path else NULL_PROFILER
+    profiler.instrument(world)
+
+    # Optional match event stream, written out by a background thread
+    telemetry = None
+    if telemetry_path:
+        from telemetry import TelemetryWriter
+        telemetry = TelemetryWriter(telemetry_path)
+        world.events = []
+
+    # Optional video capture of every flipped frame, also written out by a
+    # background thread; frames are dropped rather than waited for
+    capture = None
+    if capture_path:
+        from capture import FrameCapture
+        capture = FrameCapture(capture_path, screen.get_size())
     
     # Font setup
-    font = pygame.font.Font(None, 36)
-    
-    # Game state
-    game_over = False
+    font, overlay_font = preloader.wait_fonts()
+    hud = Hud(font)
+    game_over_screen = GameOverScreen(font)
     
     while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_z:
-                    player.attack()
-                elif event.key == pygame.K_SPACE:
-                    player.jump()
-                elif event.key == pygame.K_x:
-                    player.aerial_attack()
-                elif event.key == pygame.K_LSHIFT:
-                    # Dash in the direction the player is facing or moving
-                    keys = pygame.key.get_pressed()
-                    if keys[pygame.K_LEFT]:
-                        player.dash(-1)
-                    elif keys[pygame.K_RIGHT]:
-                        player.dash(1)
-                    else:
-                        player.dash(1 if player.facing_right else -1)
-
-        if player.dead:
-            if not game_over:  # Only set game_over once when player dies
-                game_over = True
-            
-            # Game Over screen
-            screen.fill(WHITE)
-            game_over_text = font.render(f'Game Over - Wave: {current_wave}', True, BLACK)
-            score_text = font.render(f'Final Score: {score}', True, BLACK)
-            restart_text = font.render('Press SPACE to restart', True, BLACK)
-            
-            game_over_rect = game_over_text.get_rect(center=(WIDTH/2, HEIGHT/2 - 40))
-            score_rect = score_text.get_rect(center=(WIDTH/2, HEIGHT/2))
-            restart_rect = restart_text.get_rect(center=(WIDTH/2, HEIGHT/2 + 40))
-            
-            screen.blit(game_over_text, game_over_rect)
-            screen.blit(score_text, score_rect)
-            screen.blit(restart_text, restart_rect)
+        if preloader is not None and not preloader.is_alive():
+            preloader.install()
+            preloader = None
+            timer.mark('preloaded')
+            if profile_path:
+                profiler.startup = timer.marks
+            if startup_time:
+                print(f'startup: {timer.report()}')
+        frame_start = time.perf_counter()
+        profiler.begin_frame()
+        with profiler.phase('events'):
+            events = pygame.event.get()
+            for event in events:
+                if event.type == pygame.QUIT:
+                    if replay is not None and not world.game_over:
+                        replay.save(match_path(record_path, match_number))
+                    profiler.dump(profile_path)
+                    if telemetry is not None:
+                        telemetry.close()
+                    if capture is not None:
+                        capture.close()
+                        print('capture: ' + ' '.join(f'{k}={v}' for k, v in capture.stats().items()))
+                    pygame.quit()
+                    sys.exit()
+            keys = pygame.key.get_pressed()
+            buttons = read_input(events, keys)
+            if renderer is not None and any(e.type in REPAINT_EVENTS for e in events):
+                renderer.invalidate()
+
+        if not world.game_over:
+            world.step(buttons)
+            if replay is not None:
+                replay.record(buttons)
+                if world.game_over:
+                    replay.save(match_path(record_path, match_number))
+            if telemetry is not None and world.events:
+                telemetry.submit(world.seed, world.events)
+                world.events = []
+
+        if world.game_over:
+            # Game Over screen: drawn once, then only repainted when the
+            # window asks for it, while the loop idles at a low frame rate
+            if not game_over_screen.shown or any(e.type in REPAINT_EVENTS for e in events):
+                game_over_screen.draw(screen, world.current_wave, world.score, WHITE)
+                pygame.display.flip()
+                if capture is not None:
+                    capture.capture(screen)
             
             # Check for restart
-            keys = pygame.key.get_pressed()
             if keys[pygame.K_SPACE]:
-                # Reset game state
-                player, enemy, dead_enemies, current_wave, score = reset_game()
-                game_over = False
+                world.reset()
+                game_over_screen.shown = False
+                if renderer is not None:
+                    renderer.invalidate()
+                if replay is not None:
+                    replay = Replay(world.seed)
+                    match_number += 1
             
-            pygame.display.flip()
+            clock.tick(GAME_OVER_FPS)
             continue
 
-        # Handle continuous keyboard input
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_LEFT]:
-            player.move(-player.speed)
-        if keys[pygame.K_RIGHT]:
-            player.move(player.speed)
-
-        # Spawn new enemy if current one is dead
-        if enemy.dead and enemy not in dead_enemies:
-            dead_enemies.append(enemy)
-            score += 100 * current_wave  # More points for higher waves
-            current_wave += 1
+        tier = governor.tier
+        if renderer is None:
+            draw_world(screen, world, background, hud, profiler, tier)
+            with profiler.phase('hud'):
+                profiler.draw_overlay(screen, overlay_font)
             
-            # Create new enemy with increased stats and random spawn
-            spawn_side = random.choice(['left', 'right'])
-            if spawn_side == 'left':
-                spawn_x = random.randint(50, WIDTH//3)  # Left third of screen
-                facing_right = True
-            else:
-                spawn_x = random.randint(2*WIDTH//3, WIDTH-50)  # Right third of screen
-                facing_right = False
-                
-            enemy = Stickman(spawn_x, facing_right)
-            # More gradual speed increase
-            enemy.speed = min(5 + current_wave * 0.25, 8)  # Cap speed at 8, slower increase
-            # More gradual health increase
-            enemy.health = 100 + (current_wave * 5)  # 5 HP per wave instead of 10
-
-        # Enemy AI - gets more aggressive with each wave
-        if not enemy.dead:
-            if pygame.time.get_ticks() % max(3 - current_wave//10, 2) == 0:  # Slower reaction improvement
-                if abs(player.x - enemy.x) < 80 and not enemy.attacking:
-                    # More gradual attack chance increase
-                    if random.random() < min(0.3 + current_wave * 0.02, 0.6):  # Cap at 60% instead of 80%
-                        enemy.attack()
-                else:
-                    # More gradual speed factor increase
-                    speed_factor = min(0.25 + current_wave * 0.05, 0.75)  # Cap at 75% instead of 100%
-                    if player.x < enemy.x:
-                        enemy.move(-enemy.speed * speed_factor)
-                    elif player.x > enemy.x:
-                        enemy.move(enemy.speed * speed_factor)
-
-        # Check for hits
-        if player.attacking and player.attack_frame == 3:
-            if abs(player.x - enemy.x) < 80:
-                # Regular attack damage
-                enemy.take_damage(20)
-        
-        # Aerial attack does more damage and has wider range
-        if player.spinning:
-            if abs(player.x - enemy.x) < 100:  # Larger hit range
-                enemy.take_damage(35)  # More damage
-
-        if enemy.attacking and enemy.attack_frame == 3:
-            if abs(player.x - enemy.x) < 80:
-                # Reduced base damage and slower scaling
-                base_damage = 6  # Reduced from 10
-                wave_damage = min(current_wave * 0.3, 4)  # Slower scaling, max +4
-                player.take_damage(base_damage + wave_damage)
-
-        # Update
-        player.update()
-        enemy.update()
-
-        # Draw
-        screen.fill(WHITE)
-        pygame.draw.line(screen, BLACK, (0, GROUND_Y), (WIDTH, GROUND_Y), 2)
-        
-        # Draw all dead enemies first
-        for dead_enemy in dead_enemies:
-            dead_enemy.draw(screen)
-        
-        # Draw current enemy and player
-        enemy.draw(screen)
-        player.draw(screen)
-        
-        # Draw wave number and score
-        wave_text = font.render(f'Wave: {current_wave}', True, BLACK)
-        score_text = font.render(f'Score: {score}', True, BLACK)
-        screen.blit(wave_text, (10, 10))
-        screen.blit(score_text, (10, 50))
-        
-        # Update display
-        pygame.display.flip()
+            # Update display
+            with profiler.phase('flip'):
+                pygame.display.flip()
+        else:
+            with profiler.phase('draw'):
+                restored = renderer.restore(screen, world.corpses)
+            drawn = draw_scene(screen, world, hud, profiler, tier)
+            with profiler.phase('hud'):
+                drawn.append(profiler.draw_overlay(screen, overlay_font))
+            with profiler.phase('flip'):
+                renderer.present(restored, drawn)
+        if capture is not None:
+            with profiler.phase('capture'):
+                capture.capture(screen)
+        profiler.end_frame(dict(world_counters(world), quality=governor.level) if profile_path else None)
+        # Work time only; the wait in clock.tick is headroom
+        governor.update((time.perf_counter() - frame_start) * 1000)
         clock.tick(60)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Stickman Fight")
+    parser.add_argument("--seed", type=parse_seed, help="seed for the first match")
+    parser.add_argument("--record", metavar="PATH",
+                        help="write a replay of each match to its own file, PATH with the match "
+                             "number before the extension (match.rpl -> match-1.rpl, ...)")
+    parser.add_argument("--profile", metavar="PATH", nargs="?", const="profile.json",
+                        help="show the frame-time overlay and write a JSON report to PATH on exit "
+                             "(default: profile.json)")
+    parser.add_argument("--horde", action="store_true", help="waves of many simultaneous enemies")
+    parser.add_argument("--mixed", action="store_true",
+                        help="enemies that kite, dash in or spin, not only chasers")
+    parser.add_argument("--telemetry", metavar="PATH", nargs="?", const="events.bin",
+                        help="stream match events to PATH, rotated by size (default: events.bin)")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="redraw and update only the changed parts of the screen each frame")
+    parser.add_argument("--quality", choices=("auto",) + TIER_NAMES, default="auto",
+                        help="effect quality; auto lowers it while frames run over budget "
+                             "(default: auto)")
+    parser.add_argument("--capture", metavar="PATH", nargs="?", const="capture.smc",
+                        help="record every frame to PATH for QA and highlights, see capture.py "
+                             "(default: capture.smc)")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="print how long startup took, up to the first frame and until "
+                             "assets finished loading")
+    args = parser.parse_args()
+    if (args.horde or args.mixed) and args.record:
+        # Replays store only seed and inputs, which assumes the default balance
+        parser.error("--record cannot be combined with --horde or --mixed")
+    balance = HORDE_BALANCE if args.horde else Balance()
+    if args.mixed:
+        balance = balance._replace(**BEHAVIOR_MIX)
+    main(args.seed, args.record, args.profile, balance,
+         args.dirty_rects, args.telemetry, args.startup_time, args.quality,
+         args.capture)
@@ -0,0 +1,385 @@
+import argparse
+import random
+import socket
+import struct
+import sys
+import time
+import zlib
+from collections import deque
+
+from combat import ATTACK_RANGE
+from main import CORPSE_STATE, INPUT_ATTACK, INPUT_LEFT, INPUT_RIGHT, World, parse_seed
+
+# Two-player online matches over UDP with rollback netcode. The host plays
+# the stickman, the guest controls the enemy. Both peers run the same
+# deterministic World from a shared seed and exchange only input bitmasks:
+#
+#   - Local inputs are scheduled `input_delay` frames ahead, which hides
+#     that much latency without any correction.
+#   - A remote input that has not arrived yet is predicted (the peer is
+#     assumed to still hold its last confirmed input) and the frame is
+#     simulated anyway.
+#   - The world state before every unconfirmed frame is snapshotted. When
+#     a remote input arrives that differs from the prediction, the world is
+#     restored to that frame and the frames since are re-simulated.
+#   - A peer never runs more than `max_rollback` frames past the last
+#     fully confirmed one; beyond that it stalls until inputs arrive.
+#
+# Every input packet repeats all inputs the peer has not acknowledged, so
+# lost datagrams need no retransmission logic. Peers also exchange state
+# checksums of confirmed frames to detect desyncs.
+#
+#   python netplay.py host [--port 7777]
+#   python netplay.py join HOST [--port 7777]
+#   python netplay.py loopback --delay 6 --loss 0.1   # two bots, one process
+
+MAGIC = b'SMNP'
+HEADER = struct.Struct('<4sB')       # magic, packet kind
+WELCOME = struct.Struct('<Q')        # seed
+INPUTS = struct.Struct('<IIIIB')     # ack, checksum frame, checksum, first frame, count
+HELLO_KIND, WELCOME_KIND, INPUTS_KIND = 1, 2, 3
+
+DEFAULT_PORT = 7777
+INPUT_DELAY = 2
+MAX_ROLLBACK = 8
+CHECKSUM_INTERVAL = 30   # Frames between exchanged state checksums
+MAX_PACKET_INPUTS = 255
+PEER_TIMEOUT = 5.0       # Seconds of silence before the peer counts as gone
+
+
+class NetplayError(Exception):
+    pass
+
+
+class UdpTransport:
+    # Non-blocking datagram socket bound to `bind`, talking to one peer.
+    # `delay` and `loss` simulate a bad network for testing: outgoing
+    # packets are held for `delay` calls to flush() and dropped with
+    # probability `loss`.
+    def __init__(self, bind, peer=None, delay=0, loss=0.0, seed=None):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(bind)
+        self.sock.setblocking(False)
+        self.peer = peer
+        self.delay = delay
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.outbox = deque()
+        self.clock = 0
+
+    @property
+    def address(self):
+        return self.sock.getsockname()
+
+    def send(self, kind, body=b''):
+        if self.peer is None:
+            return
+        if self.loss and self.rng.random() < self.loss:
+            return
+        self.outbox.append((self.clock + self.delay, HEADER.pack(MAGIC, kind) + body))
+        self.flush(advance=False)
+
+    def flush(self, advance=True):
+        if advance:
+            self.clock += 1
+        while self.outbox and self.outbox[0][0] <= self.clock:
+            try:
+                self.sock.sendto(self.outbox.popleft()[1], self.peer)
+            except OSError:
+                pass  # Nobody listening yet; later packets repeat the inputs
+
+    def receive(self):
+        # Yields (kind, body, address) for every datagram waiting
+        while True:
+            try:
+                data, address = self.sock.recvfrom(2048)
+            except (BlockingIOError, ConnectionResetError):
+                return
+            if len(data) >= HEADER.size:
+                magic, kind = HEADER.unpack_from(data)
+                if magic == MAGIC:
+                    yield kind, data[HEADER.size:], address
+
+    def close(self):
+        self.sock.close()
+
+
+def host(transport, seed=None, timeout=None):
+    # Wait for a guest's hello and answer with the match seed
+    seed = seed if seed is not None else random.getrandbits(63)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while deadline is None or time.monotonic() < deadline:
+        for kind, _, address in transport.receive():
+            if kind == HELLO_KIND:
+                transport.peer = address
+                transport.send(WELCOME_KIND, WELCOME.pack(seed))
+                return seed
+        time.sleep(0.01)
+    raise NetplayError('no guest joined')
+
+
+def join(transport, timeout=10.0, retry=0.1):
+    # Say hello until the host answers with the seed
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        transport.send(HELLO_KIND)
+        transport.flush()
+        end = time.monotonic() + retry
+        while time.monotonic() < end:
+            for kind, body, _ in transport.receive():
+                if kind == WELCOME_KIND and len(body) == WELCOME.size:
+                    return WELCOME.unpack(body)[0]
+            time.sleep(0.005)
+    raise NetplayError('host did not answer')
+
+
+def state_checksum(state):
+    # CRC of a World.snapshot(): counters, the living fighters and the
+    # corpses, packed so that 350 and 350.0 checksum alike
+    checksum = zlib.crc32(repr(state[:5]).encode())
+    corpses = b''.join(CORPSE_STATE.pack(*corpse) for corpse in state.corpses)
+    for data in [state.player] + state.enemies + [corpses]:
+        checksum = zlib.crc32(data, checksum)
+    return checksum
+
+
+class RollbackSession:
+    # Drives one peer's World. Call update(buttons) once per tick with the
+    # local input; it returns whether the world advanced a frame.
+    def __init__(self, world, transport, is_host, input_delay=INPUT_DELAY, max_rollback=MAX_ROLLBACK):
+        self.world = world
+        self.transport = transport
+        self.is_host = is_host
+        self.input_delay = input_delay
+        self.max_rollback = max_rollback
+        self.seed = world.seed
+        self.frame = 0            # Next frame to simulate
+        self.confirmed = 0        # Remote inputs are known for every frame before this
+        self.acked = 0            # The peer has our inputs for every frame before this
+        self.local_inputs = dict.fromkeys(range(input_delay), 0)
+        self.remote_inputs = {}
+        self.used = {}            # Remote input each frame was last simulated with
+        self.snapshots = {}       # World state before each frame not yet final
+        self.checksums = {}       # Our checksums of final frames
+        self.sent_checksum = (0, 0)
+        self.rollback_from = None
+        self.last_heard = time.monotonic()
+        self.stats = {'rollbacks': 0, 'resimulated': 0, 'stalls': 0, 'checksums': 0, 'desyncs': 0}
+
+    def update(self, buttons):
+        self.poll()
+        if self.rollback_from is not None:
+            self.rollback()
+        advanced = self.frame - self.confirmed < self.max_rollback
+        if advanced:
+            self.local_inputs[self.frame + self.input_delay] = buttons
+            self.simulate(self.frame)
+            self.frame += 1
+        else:
+            self.stats['stalls'] += 1
+        self.send_inputs()
+        self.transport.flush()
+        return advanced
+
+    def simulate(self, frame):
+        self.snapshots[frame] = self.world.snapshot()
+        remote = self.remote_inputs.get(frame)
+        if remote is None:
+            remote = self.remote_inputs.get(self.confirmed - 1, 0)
+        self.used[frame] = remote
+        local = self.local_inputs[frame]
+        if self.is_host:
+            self.world.step(local, remote)
+        else:
+            self.world.step(remote, local)
+
+    def rollback(self):
+        start = self.rollback_from
+        self.rollback_from = None
+        self.world.restore(self.snapshots[start])
+        for frame in range(start, self.frame):
+            self.simulate(frame)
+        self.stats['rollbacks'] += 1
+        self.stats['resimulated'] += self.frame - start
+
+    def poll(self):
+        for kind, body, address in self.transport.receive():
+            self.last_heard = time.monotonic()
+            if kind == HELLO_KIND and self.is_host:
+                # Our welcome was lost; the guest is still asking
+                self.transport.send(WELCOME_KIND, WELCOME.pack(self.seed))
+            elif kind == INPUTS_KIND and len(body) >= INPUTS.size:
+                self.receive_inputs(body)
+        self.prune()
+
+    def receive_inputs(self, body):
+        ack, checksum_frame, checksum, first, count = INPUTS.unpack_from(body)
+        inputs = body[INPUTS.size:INPUTS.size + count]
+        self.acked = max(self.acked, ack)
+        for frame, buttons in enumerate(inputs, first):
+            if frame in self.remote_inputs or frame < self.confirmed:
+                continue
+            self.remote_inputs[frame] = buttons
+            if frame < self.frame and self.used[frame] != buttons:
+                if self.rollback_from is None or frame < self.rollback_from:
+                    self.rollback_from = frame
+        while self.confirmed in self.remote_inputs:
+            self.confirmed += 1
+        if checksum_frame and checksum_frame in self.checksums:
+            self.stats['checksums'] += 1
+            if self.checksums.pop(checksum_frame) != checksum:
+                self.stats['desyncs'] += 1
+
+    def prune(self):
+        # Frames before the last confirmed one can no longer be rolled back
+        # to: their snapshots are final (and checksummed every
+        # CHECKSUM_INTERVAL frames) and dropped. Local inputs are kept until
+        # the peer has them and no rollback can need them.
+        oldest = min(self.confirmed, self.frame)
+        if self.rollback_from is not None:
+            oldest = min(oldest, self.rollback_from)
+        for frame in [f for f in self.snapshots if f < oldest]:
+            snapshot = self.snapshots.pop(frame)
+            if frame % CHECKSUM_INTERVAL == 0:
+                self.checksums[frame] = state_checksum(snapshot)
+        for frame in [f for f in self.used if f < oldest]:
+            del self.used[frame]
+        # The last confirmed remote input is the prediction for later frames
+        for frame in [f for f in self.remote_inputs if f < min(oldest, self.confirmed - 1)]:
+            del self.remote_inputs[frame]
+        for frame in [f for f in self.local_inputs if f < min(self.acked, oldest)]:
+            del self.local_inputs[frame]
+        for frame in [f for f in self.checksums if f < oldest - 4 * CHECKSUM_INTERVAL]:
+            del self.checksums[frame]
+
+    def send_inputs(self):
+        first = self.acked
+        last = self.frame + self.input_delay
+        count = min(last - first, MAX_PACKET_INPUTS)
+        inputs = bytes(self.local_inputs[f] for f in range(first, first + count))
+        if self.checksums:
+            frame = max(self.checksums)
+            self.sent_checksum = (frame, self.checksums[frame])
+        body = INPUTS.pack(self.confirmed, *self.sent_checksum, first, count) + inputs
+        self.transport.send(INPUTS_KIND, body)
+
+
+def enemy_chaser(world):
+    # Guest-side bot for loopback tests: walk the enemy at the player and swing
+    enemy, player = world.enemy, world.player
+    buttons = INPUT_LEFT if player.x < enemy.x else INPUT_RIGHT
+    if abs(player.x - enemy.x) < ATTACK_RANGE:
+        buttons |= INPUT_ATTACK
+    return buttons
+
+
+def loopback(ticks, delay=0, loss=0.0, input_delay=INPUT_DELAY, max_rollback=MAX_ROLLBACK, seed=1):
+    # Two bot peers in one process over 127.0.0.1. Returns both sessions.
+    from bots import spinner
+
+    a = UdpTransport(('127.0.0.1', 0), seed=seed)
+    b = UdpTransport(('127.0.0.1', 0), peer=a.address, seed=seed + 1)
+    b.send(HELLO_KIND)
+    match_seed = host(a, seed, timeout=5)
+    if join(b, timeout=5) != match_seed:
+        raise NetplayError('seed mismatch')
+    # Network trouble is only simulated once connected
+    for transport in (a, b):
+        transport.delay = delay
+        transport.loss = loss
+    host_session = RollbackSession(World(match_seed), a, True, input_delay, max_rollback)
+    guest_session = RollbackSession(World(match_seed), b, False, input_delay, max_rollback)
+    for _ in range(ticks):
+        if host_session.world.game_over and guest_session.world.game_over:
+            break
+        host_session.update(spinner(host_session.world))
+        guest_session.update(enemy_chaser(guest_session.world))
+    a.close()
+    b.close()
+    return host_session, guest_session
+
+
+def play(session, title, linger=60):
+    # Windowed match for one peer. Once the match is over on both peers (or
+    # the peer went quiet) inputs keep flowing for `linger` more ticks so
+    # the other side can confirm the end too, then the window closes.
+    import pygame
+    from hud import Hud
+    from main import HEIGHT, WIDTH, Background, draw_world, read_input
+
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption(title)
+    clock = pygame.time.Clock()
+    background = Background()
+    hud = Hud(pygame.font.Font(None, 36))
+    world = session.world
+    while True:
+        events = pygame.event.get()
+        if any(event.type == pygame.QUIT for event in events):
+            break
+        session.update(read_input(events, pygame.key.get_pressed()))
+        if world.game_over and session.confirmed >= session.frame:
+            break
+        if time.monotonic() - session.last_heard > PEER_TIMEOUT:
+            print('peer disconnected', file=sys.stderr)
+            break
+        draw_world(screen, world, background, hud)
+        pygame.display.flip()
+        clock.tick(60)
+    for _ in range(linger):
+        session.update(0)
+        clock.tick(60)
+    pygame.quit()
+    print(f'wave={world.current_wave} score={world.score} game_over={world.game_over} '
+          + ' '.join(f'{k}={v}' for k, v in session.stats.items()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Stickman Fight over UDP with rollback netcode.')
+    parser.add_argument('mode', choices=('host', 'join', 'loopback'))
+    parser.add_argument('address', nargs='?', help='host to join')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--seed', type=parse_seed, help='match seed (host and loopback)')
+    parser.add_argument('--input-delay', type=int, default=INPUT_DELAY, help='frames of local input delay')
+    parser.add_argument('--max-rollback', type=int, default=MAX_ROLLBACK,
+                        help='frames a peer may run ahead of confirmed inputs')
+    parser.add_argument('--delay', type=int, default=0, help='simulated outgoing delay in ticks')
+    parser.add_argument('--loss', type=float, default=0.0, help='simulated outgoing packet loss')
+    parser.add_argument('--ticks', type=int, default=5000, help='loopback match length')
+    args = parser.parse_args(argv)
+
+    if args.mode == 'loopback':
+        sessions = loopback(args.ticks, args.delay, args.loss, args.input_delay, args.max_rollback,
+                            args.seed if args.seed is not None else 1)
+        for name, session in zip(('host', 'guest'), sessions):
+            world = session.world
+            print(f'{name:<6} frames={session.frame} wave={world.current_wave} score={world.score} '
+                  + ' '.join(f'{k}={v}' for k, v in session.stats.items()))
+        return 1 if any(s.stats['desyncs'] for s in sessions) else 0
+
+    try:
+        if args.mode == 'host':
+            transport = UdpTransport(('0.0.0.0', args.port))
+            print(f'waiting for a guest on port {args.port}')
+            seed = host(transport, args.seed)
+        else:
+            if not args.address:
+                parser.error('join needs the host address')
+            transport = UdpTransport(('0.0.0.0', 0), (args.address, args.port))
+            seed = join(transport)
+    except NetplayError as e:
+        print(e, file=sys.stderr)
+        return 1
+    transport.delay = args.delay
+    transport.loss = args.loss
+    is_host = args.mode == 'host'
+    session = RollbackSession(World(seed), transport, is_host, args.input_delay, args.max_rollback)
+    play(session, 'Stickman Fight - ' + ('host' if is_host else 'guest'))
+    transport.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
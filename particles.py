@@ -0,0 +1,115 @@
+import math
+import struct
+
+import numpy as np
+
+from sprites import sprite_cache
+
+# Pooled particle system. Every particle lives in a slot of a fixed set of
+# NumPy arrays, so spawning reuses dead slots instead of allocating objects
+# and a whole pool is integrated with a handful of vectorized operations.
+
+GRAVITY = 0.1
+UPWARD_BIAS = 1  # Subtracted from vy at spawn for a slight upward burst
+
+# pack() layout: remaining ticks and live count, the live slot numbers,
+# then each per-particle array restricted to the live slots
+PACK_HEADER = struct.Struct('<hH')
+
+
+class ParticlePool:
+    def __init__(self, capacity=128, rng=None):
+        self.capacity = capacity
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32)
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.lifetime = np.zeros(capacity, dtype=np.int16)  # <= 0 means the slot is free
+        self.max_lifetime = np.ones(capacity, dtype=np.int16)
+        self.size = np.zeros(capacity, dtype=np.int16)
+        self.color = np.zeros((capacity, 3), dtype=np.uint8)
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.remaining = 0  # Ticks until every live particle has expired
+
+    def __len__(self):
+        if self.remaining <= 0:
+            return 0
+        return int(np.count_nonzero(self.lifetime > 0))
+
+    def clear(self):
+        self.lifetime[:] = 0
+        self.remaining = 0
+
+    def emit(self, x, y, color, count, size=(2, 2), speed=(2, 2), lifetime=30):
+        # size and speed are inclusive (min, max) ranges sampled per particle.
+        # When the pool is full the extra particles are simply dropped.
+        free = np.flatnonzero(self.lifetime <= 0)[:count]
+        n = len(free)
+        if n == 0:
+            return 0
+        angle = self.rng.uniform(0, math.pi * 2, n)
+        spd = self.rng.uniform(speed[0], speed[1], n)
+        self.x[free] = x
+        self.y[free] = y
+        self.vx[free] = np.cos(angle) * spd
+        self.vy[free] = np.sin(angle) * spd - UPWARD_BIAS
+        self.lifetime[free] = lifetime
+        self.max_lifetime[free] = lifetime
+        self.size[free] = self.rng.integers(size[0], size[1] + 1, n)
+        self.color[free] = color
+        self.remaining = max(self.remaining, lifetime)
+        return n
+
+    def update(self):
+        # Idle pools (most fighters, most of the time) cost nothing
+        if self.remaining <= 0:
+            return
+        self.remaining -= 1
+        # Free slots are integrated too; that is cheaper than masking and
+        # their positions are overwritten on the next emit anyway
+        self.x += self.vx
+        self.y += self.vy
+        self.vy += GRAVITY
+        self.lifetime -= self.lifetime > 0
+
+    def live_indices(self):
+        return np.flatnonzero(self.lifetime > 0)
+
+    def arrays(self):
+        return (self.x, self.y, self.vx, self.vy, self.lifetime, self.max_lifetime, self.size, self.color)
+
+    def pack(self):
+        live = self.live_indices() if self.remaining > 0 else np.empty(0, dtype=np.intp)
+        return b''.join([PACK_HEADER.pack(self.remaining, len(live)), live.astype(np.uint16).tobytes()] +
+                        [array[live].tobytes() for array in self.arrays()])
+
+    def unpack(self, data, offset=0):
+        # Restore from pack() output at `offset`; returns the offset after it
+        remaining, count = PACK_HEADER.unpack_from(data, offset)
+        offset += PACK_HEADER.size
+        slots = np.frombuffer(data, np.uint16, count, offset)
+        offset += slots.nbytes
+        self.lifetime[:] = 0
+        for array in self.arrays():
+            values = np.frombuffer(data, array.dtype, count * (array.size // self.capacity), offset)
+            array[slots] = values.reshape((count,) + array.shape[1:])
+            offset += values.nbytes
+        self.remaining = remaining
+        return offset
+
+    def draw(self, surface, step=1):
+        # Draws every `step`th live particle (none for 0). Returns the
+        # bounding rectangle of the drawn particles, or None.
+        if self.remaining <= 0 or step <= 0:
+            return None
+        live = self.live_indices()[::step]
+        if len(live) == 0:
+            return None
+        alphas = (255 * self.lifetime[live].astype(np.int32) // self.max_lifetime[live]).tolist()
+        xs = self.x[live].tolist()
+        ys = self.y[live].tolist()
+        sizes = self.size[live].tolist()
+        colors = self.color[live].tolist()
+        rects = surface.blits([(sprite_cache.circle(size, color, alpha), (int(x - size), int(y - size)))
+                               for x, y, size, color, alpha in zip(xs, ys, sizes, colors, alphas)])
+        return rects[0].unionall(rects[1:])
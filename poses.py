@@ -0,0 +1,224 @@
+import math
+
+import pygame
+
+from sprites import SpriteCache
+
+# Precomputed stickman poses. Every pose a fighter can take is built once
+# per fighter size as joint offsets relative to its feet (x, y), so drawing
+# is a translate plus a few pygame.draw.lines calls instead of per-frame
+# trig. Poses are split into parts so they combine freely:
+#
+#   figure[phase]             body and legs through the run cycle
+#   idle_arms[phase]          swinging arms through the run cycle
+#   attack[facing][frame]     arm and sword for each frame of a swing
+#   spin[facing][step]        the whole rotated figure during an aerial spin
+#   dead[facing]              the fallen pose
+#
+# Polylines are tuples of points; each part lists (points, width) strokes.
+
+RUN_PHASES = 32       # Steps per run cycle
+RUN_RATE = 0.01       # Radians of run cycle per millisecond
+ATTACK_FRAMES = 6
+SPIN_STEP = 20        # Degrees per spin tick, as in Stickman.update
+SPIN_STEPS = 360 // SPIN_STEP
+
+
+def run_phase(ms):
+    # Run cycle index for a time in milliseconds
+    return int(ms * RUN_RATE * RUN_PHASES / (2 * math.pi)) % RUN_PHASES
+
+
+class PoseTable:
+    def __init__(self, size):
+        s = size
+        self.size = size
+        self.head = (0, -s)
+        self.head_radius = s // 4
+        neck = (0, -s + s//4)
+        hip = (0, -(s//2))
+        shoulder = (0, -s + s//3)
+
+        self.figure = []
+        self.idle_arms = []
+        for k in range(RUN_PHASES):
+            swing = math.sin(2 * math.pi * k / RUN_PHASES)
+            leg_offset = swing * 10
+            arm_offset = swing * 5
+            foot1 = (-(s//4) + leg_offset, 0)
+            foot2 = (s//4 - leg_offset, 0)
+            self.figure.append((((foot1, hip, neck), 2), ((hip, foot2), 2)))
+            hand1 = (-(s//4), -(s//1.5) + arm_offset)
+            hand2 = (s//4, -(s//1.5) - arm_offset)
+            self.idle_arms.append((((hand1, shoulder, hand2), 2),))
+
+        self.attack = {}
+        weapon_length = s * 1.2
+        for facing_right in (True, False):
+            frames = []
+            for frame in range(ATTACK_FRAMES):
+                if facing_right:
+                    arm_angle = math.radians(-45 + frame * 15)
+                    weapon_start = (s//4, -s + s//3)
+                else:
+                    arm_angle = math.radians(225 - frame * 15)
+                    weapon_start = (-(s//4), -s + s//3)
+                weapon_end = (weapon_start[0] + math.cos(arm_angle) * weapon_length,
+                              weapon_start[1] + math.sin(arm_angle) * weapon_length)
+                frames.append((((weapon_start, weapon_end), 3), ((shoulder, weapon_start), 2)))
+            self.attack[facing_right] = frames
+
+        # Spin rotates the whole figure around its middle
+        center_y = -(s//2)
+        self.spin = {}
+        weapon_length = s * 1.5  # Longer sword for spin attack
+        for facing_right in (True, False):
+            steps = []
+            for step in range(SPIN_STEPS):
+                angle = math.radians(step * SPIN_STEP)
+                cos_a = math.cos(angle)
+                sin_a = math.sin(angle)
+
+                def rotate(px, py):
+                    return (px * cos_a - (py - center_y) * sin_a,
+                            px * sin_a + (py - center_y) * cos_a + center_y)
+
+                head = rotate(*self.head)
+                body_start = rotate(*neck)
+                body_end = rotate(*hip)
+                leg1_end = rotate(-(s//4), 0)
+                leg2_end = rotate(s//4, 0)
+                arm_pos = rotate(*shoulder)
+                weapon_angle = angle + (math.pi/4 if facing_right else -math.pi/4)
+                weapon_end = (arm_pos[0] + math.cos(weapon_angle) * weapon_length,
+                              arm_pos[1] + math.sin(weapon_angle) * weapon_length)
+                steps.append((head, (((leg1_end, body_end, body_start), 2),
+                                     ((body_end, leg2_end), 2),
+                                     ((arm_pos, weapon_end), 3))))
+            self.spin[facing_right] = steps
+
+        # Fallen pose: lying along the ground, head toward the facing side
+        self.dead = {}
+        for facing_right in (True, False):
+            sign = 1 if facing_right else -1
+            head = (sign * (s//2), 0)
+            hips = (-sign * (s//2), 0)
+            legs = ((-sign * (s//4), -(s//4)), hips, (-sign * (s//4), s//4))
+            self.dead[facing_right] = (head, (((hips, head), 2), (legs, 2)))
+
+    def spin_pose(self, facing_right, spin_angle):
+        return self.spin[facing_right][(spin_angle // SPIN_STEP) % SPIN_STEPS]
+
+
+_tables = {}
+
+
+def pose_table(size):
+    table = _tables.get(size)
+    if table is None:
+        table = _tables[size] = PoseTable(size)
+    return table
+
+
+def draw_strokes(surface, color, strokes, x, y):
+    return [pygame.draw.lines(surface, color, False, [(px + x, py + y) for px, py in points], width)
+            for points, width in strokes]
+
+
+# A fighter's look is fully determined by a small pose key:
+#
+#   ('idle', phase)                      standing/running, arms swinging
+#   ('attack', facing, frame, phase)     mid-swing
+#   ('spin', facing, step, flash)        aerial spin; flash is the hit tint
+#   ('dead', facing)                     fallen
+BLACK = (0, 0, 0)
+FLASH = (255, 255, 255)  # Spin strokes turn white during invulnerability
+
+
+def pose_key(fighter, ms):
+    if fighter.dead:
+        return ('dead', fighter.facing_right)
+    if fighter.spinning:
+        return ('spin', fighter.facing_right, (fighter.spin_angle // SPIN_STEP) % SPIN_STEPS,
+                fighter.hit_cooldown > 0)
+    phase = run_phase(ms)
+    if fighter.attacking:
+        return ('attack', fighter.facing_right, fighter.attack_frame % ATTACK_FRAMES, phase)
+    return ('idle', phase)
+
+
+def pose_parts(table, key):
+    # (head center, [(color, strokes), ...]) for a pose key
+    kind = key[0]
+    if kind == 'dead':
+        head, strokes = table.dead[key[1]]
+        return head, [(BLACK, strokes)]
+    if kind == 'spin':
+        _, facing_right, step, flash = key
+        head, strokes = table.spin[facing_right][step]
+        return head, [(FLASH if flash else BLACK, strokes)]
+    phase = key[-1]
+    arms = table.attack[key[1]][key[2]] if kind == 'attack' else table.idle_arms[phase]
+    return table.head, [(BLACK, table.figure[phase]), (BLACK, arms)]
+
+
+def draw_pose(surface, table, key, x, y):
+    # Returns the bounding rectangle of everything drawn
+    head, parts = pose_parts(table, key)
+    rects = []
+    for color, strokes in parts:
+        rects += draw_strokes(surface, color, strokes, x, y)
+    rect = pygame.draw.circle(surface, BLACK, (x + head[0], y + head[1]), table.head_radius, 2)
+    return rect.unionall(rects)
+
+
+def all_pose_keys():
+    keys = [('dead', f) for f in (True, False)]
+    keys += [('spin', f, step, flash) for f in (True, False)
+             for step in range(SPIN_STEPS) for flash in (False, True)]
+    keys += [('idle', phase) for phase in range(RUN_PHASES)]
+    keys += [('attack', f, frame, phase) for f in (True, False)
+             for frame in range(ATTACK_FRAMES) for phase in range(RUN_PHASES)]
+    return keys
+
+
+class PoseSprites:
+    # Each distinct (size, pose key) is rendered once into a tight SRCALPHA
+    # sprite and blitted from then on, turning the handful of draw calls per
+    # fighter into one blit
+    def __init__(self, max_size=1024):
+        self.cache = SpriteCache(max_size)
+
+    def get(self, size, key):
+        # Returns the sprite and the offset of its top-left from the feet
+        return self.cache.get((size, key), lambda: self.render(size, key))
+
+    def render(self, size, key):
+        table = pose_table(size)
+        head, parts = pose_parts(table, key)
+        r = table.head_radius
+        xs = [head[0] - r, head[0] + r]
+        ys = [head[1] - r, head[1] + r]
+        for _, strokes in parts:
+            for points, _ in strokes:
+                xs.extend(px for px, _ in points)
+                ys.extend(py for _, py in points)
+        pad = 3  # Line width plus rounding slack
+        left = math.floor(min(xs)) - pad
+        top = math.floor(min(ys)) - pad
+        sprite = pygame.Surface((math.ceil(max(xs)) - left + pad + 1,
+                                 math.ceil(max(ys)) - top + pad + 1), pygame.SRCALPHA)
+        draw_pose(sprite, table, key, -left, -top)
+        return sprite, (left, top)
+
+    def blit(self, surface, size, key, x, y):
+        sprite, (left, top) = self.get(size, key)
+        return surface.blit(sprite, (round(x) + left, round(y) + top))
+
+    def prewarm(self, size):
+        # Render every pose up front so the first fights don't pay for it
+        for key in all_pose_keys():
+            self.get(size, key)
+
+
+pose_sprites = PoseSprites()
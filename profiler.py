@@ -0,0 +1,192 @@
+import json
+import time
+from collections import deque
+
+import numpy as np
+import pygame
+
+# Opt-in frame-time instrumentation. Each frame is split into named phases
+# whose durations are kept over a rolling window, alongside per-frame
+# counters (live particles, slashes, ...). The profiler can draw an overlay
+# with rolling percentiles and dump everything as JSON at exit.
+#
+# When profiling is off the game uses NullProfiler, whose phases are no-ops,
+# and World is left uninstrumented so headless runs pay nothing.
+
+FRAME_BUDGET_MS = 1000 / 60
+PERCENTILES = (50, 95, 99)
+
+
+class _Phase:
+    # Reusable context manager timing one named phase
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, time.perf_counter() - self.start)
+
+
+class FrameProfiler:
+    def __init__(self, window=600):
+        self.window = window  # Frames kept for percentiles
+        self.samples = {}     # Phase name -> deque of per-frame milliseconds
+        self.counters = {}    # Counter name -> deque of per-frame values
+        self.current = {}
+        self.phases = {}
+        self.frames = 0
+        self.frame_start = None
+        self.overlay = None
+        self.overlay_age = 0
+        self.startup = {}     # Startup milestones in ms, see startup.StartupTimer
+
+    def phase(self, name):
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = _Phase(self, name)
+        return phase
+
+    def add(self, name, seconds):
+        # Phases may run several times per frame; their time is summed
+        self.current[name] = self.current.get(name, 0.0) + seconds * 1000
+
+    def wrap(self, name, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(name, time.perf_counter() - start)
+        return timed
+
+    def instrument(self, world):
+        # Time the phases of World.step by wrapping the bound methods on
+        # this instance only
+        world.run_enemy_ai = self.wrap('ai', world.run_enemy_ai)
+        world.check_hits = self.wrap('hits', world.check_hits)
+        world.update_fighters = self.wrap('update', world.update_fighters)
+
+    def begin_frame(self):
+        self.current = {}
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self, counters=None):
+        # Phases that did not run this frame record zero so every series
+        # stays aligned frame by frame
+        if self.frame_start is None:
+            return
+        self.current['frame'] = (time.perf_counter() - self.frame_start) * 1000
+        self.frame_start = None
+        for name in self.samples.keys() | self.current.keys():
+            series = self.samples.get(name)
+            if series is None:
+                series = self.samples[name] = deque([0.0] * min(self.frames, self.window),
+                                                    maxlen=self.window)
+            series.append(self.current.get(name, 0.0))
+        for name, value in (counters or {}).items():
+            series = self.counters.get(name)
+            if series is None:
+                series = self.counters[name] = deque(maxlen=self.window)
+            series.append(value)
+        self.frames += 1
+
+    def percentiles(self, name):
+        series = self.samples.get(name)
+        if not series:
+            return dict.fromkeys(PERCENTILES, 0.0)
+        values = np.percentile(np.fromiter(series, dtype=float), PERCENTILES)
+        return dict(zip(PERCENTILES, values.tolist()))
+
+    def report(self):
+        return {
+            'frames': self.frames,
+            'window': self.window,
+            'budget_ms': FRAME_BUDGET_MS,
+            'startup_ms': self.startup,
+            'phases_ms': {name: {f'p{p}': round(v, 4) for p, v in self.percentiles(name).items()}
+                          for name in sorted(self.samples)},
+            'over_budget_frames': int(sum(ms > FRAME_BUDGET_MS for ms in self.samples.get('frame', ()))),
+            'counters': {name: {'last': series[-1], 'max': max(series)}
+                         for name, series in sorted(self.counters.items()) if series},
+        }
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+    def draw_overlay(self, surface, font, refresh=30):
+        # Percentiles are recomputed and re-rendered every `refresh` frames
+        if self.overlay is None or self.overlay_age >= refresh:
+            lines = ['phase     p50   p95   p99 ms']
+            for name in sorted(self.samples, key=lambda n: (n == 'frame', n)):
+                p = self.percentiles(name)
+                lines.append(f'{name:<8}{p[50]:6.2f}{p[95]:6.2f}{p[99]:6.2f}')
+            for name, series in sorted(self.counters.items()):
+                if series:
+                    lines.append(f'{name:<14}{series[-1]:>6}')
+            rendered = [font.render(line, True, (0, 0, 0)) for line in lines]
+            width = max(r.get_width() for r in rendered) + 8
+            height = sum(r.get_height() for r in rendered) + 8
+            self.overlay = pygame.Surface((width, height), pygame.SRCALPHA)
+            self.overlay.fill((255, 255, 200, 200))
+            y = 4
+            for r in rendered:
+                self.overlay.blit(r, (4, y))
+                y += r.get_height()
+            self.overlay_age = 0
+        self.overlay_age += 1
+        return surface.blit(self.overlay, (surface.get_width() - self.overlay.get_width() - 5, 5))
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+class NullProfiler:
+    # Same interface as FrameProfiler, doing nothing
+    _phase = _NullPhase()
+
+    def phase(self, name):
+        return self._phase
+
+    def instrument(self, world):
+        pass
+
+    def begin_frame(self):
+        pass
+
+    def end_frame(self, counters=None):
+        pass
+
+    def draw_overlay(self, surface, font, refresh=30):
+        return None
+
+    def dump(self, path):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def world_counters(world):
+    # Live effect and corpse counts for one frame
+    fighters = [world.player] + world.enemies + world.dead_enemies
+    return {
+        'particles': sum(len(f.particles) for f in fighters),
+        'slashes': sum(len(f.slash_effects) for f in fighters),
+        'trail_dots': sum(len(f.dash_trail) for f in fighters),
+        'dead_enemies': len(world.dead_enemies) + len(world.corpses),
+        'ai_thinks': world.ai.thinks,
+        'ai_deferred': world.ai.deferred,
+    }
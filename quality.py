@@ -0,0 +1,99 @@
+from collections import namedtuple
+
+from profiler import FRAME_BUDGET_MS
+
+# Adaptive effect quality. Spins, hits and dashes can pile up more slashes,
+# blood and trail dots than a weak machine can draw in a frame, so the game
+# loop reports how long each frame's work took (excluding the wait for the
+# frame cap) and the governor steps down a tier when the smoothed time
+# stays near the 16.6 ms budget, and back up once there is headroom again.
+#
+# Tiers only change what is drawn. Effects are still spawned and simulated
+# in full, so replays, rollback snapshots and netplay checksums are the same
+# on every machine whatever tier it runs at.
+#
+#   particle_step   draw every Nth live particle, 0 for none
+#   slash_glow      draw the wide glow line around slashes
+#   trail_step      draw every Nth dash trail dot, 0 for none
+#
+# Finished corpses are not tiered: they are baked into the background layer
+# once and cost nothing per frame after that.
+
+QualityTier = namedtuple('QualityTier', 'name particle_step slash_glow trail_step')
+
+TIERS = (
+    QualityTier('high', 1, True, 1),
+    QualityTier('medium', 2, True, 2),
+    QualityTier('low', 4, False, 3),
+    QualityTier('minimal', 0, False, 0),
+)
+TIER_NAMES = tuple(tier.name for tier in TIERS)
+HIGH = TIERS[0]
+
+SMOOTHING = 0.1            # Weight of the newest frame in the moving average
+DOWNGRADE_AT = 0.9         # Of the budget: step down when the average is above
+UPGRADE_AT = 0.5           # Of the budget: step up when it stays below
+DOWNGRADE_FRAMES = 15      # Frames the average must stay high
+UPGRADE_FRAMES = 180       # Frames it must stay low; upgrading is cautious
+SETTLE_FRAMES = 30         # Ignore frames after a change while caches warm up
+
+
+class QualityGovernor:
+    def __init__(self, budget_ms=FRAME_BUDGET_MS, level=0):
+        self.budget_ms = budget_ms
+        self.level = level
+        self.locked = False
+        self.average_ms = 0.0
+        self.slow_frames = 0
+        self.fast_frames = 0
+        self.settle = SETTLE_FRAMES
+        self.changes = 0
+
+    @property
+    def tier(self):
+        return TIERS[self.level]
+
+    def set_tier(self, tier, lock=True):
+        # Switch to a tier by name or level. Locked tiers stay until
+        # unlock(); this is what --quality uses.
+        self.level = TIER_NAMES.index(tier) if isinstance(tier, str) else tier
+        self.locked = lock
+        self.reset()
+
+    def unlock(self):
+        self.locked = False
+        self.reset()
+
+    def reset(self):
+        self.average_ms = 0.0
+        self.slow_frames = 0
+        self.fast_frames = 0
+        self.settle = SETTLE_FRAMES
+
+    def update(self, frame_ms):
+        # Feed the work time of one frame; returns True when the tier changed
+        if self.locked:
+            return False
+        if self.settle > 0:
+            self.settle -= 1
+            self.average_ms = frame_ms
+            return False
+        self.average_ms += (frame_ms - self.average_ms) * SMOOTHING
+        if self.average_ms > self.budget_ms * DOWNGRADE_AT:
+            self.slow_frames += 1
+            self.fast_frames = 0
+        elif self.average_ms < self.budget_ms * UPGRADE_AT:
+            self.fast_frames += 1
+            self.slow_frames = 0
+        else:
+            self.slow_frames = self.fast_frames = 0
+
+        if self.slow_frames >= DOWNGRADE_FRAMES and self.level < len(TIERS) - 1:
+            self.level += 1
+        elif self.fast_frames >= UPGRADE_FRAMES and self.level > 0:
+            self.level -= 1
+        else:
+            return False
+        self.changes += 1
+        self.reset()
+        return True
@@ -0,0 +1,171 @@
+import argparse
+import os
+import struct
+import sys
+
+from main import World
+
+# Compact binary replays. A match is fully determined by its seed and the
+# per-tick input bitmasks, so that is all we store:
+#
+#   header   magic b'SMRP', version u8, stream count u8, seed u64, ticks u32
+#   streams  per stream: run count (varint), then runs of
+#            (input byte, run length varint)
+#
+# Stream 0 holds the player's inputs; an optional stream 1 holds the
+# enemy's inputs for bot-vs-bot matches (absent means the built-in AI).
+# Inputs are held for many ticks at a time, so run-length encoding usually
+# brings a match down to a few bytes per second of play.
+
+MAGIC = b'SMRP'
+VERSION = 1
+HEADER = struct.Struct('<4sBBQI')
+
+
+class ReplayError(ValueError):
+    pass
+
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    value = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ReplayError('truncated replay')
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def encode_runs(out, inputs):
+    runs = []
+    for value in inputs:
+        if runs and runs[-1][0] == value:
+            runs[-1][1] += 1
+        else:
+            runs.append([value, 1])
+    write_varint(out, len(runs))
+    for value, length in runs:
+        out.append(value)
+        write_varint(out, length)
+
+
+def decode_runs(data, pos, ticks):
+    inputs = bytearray()
+    count, pos = read_varint(data, pos)
+    for _ in range(count):
+        if pos >= len(data):
+            raise ReplayError('truncated replay')
+        value = data[pos]
+        length, pos = read_varint(data, pos + 1)
+        inputs.extend(bytes((value,)) * length)
+    if len(inputs) != ticks:
+        raise ReplayError(f'stream has {len(inputs)} ticks, header says {ticks}')
+    return inputs, pos
+
+
+class Replay:
+    def __init__(self, seed, inputs=None, enemy_inputs=None):
+        self.seed = seed
+        self.inputs = bytearray(inputs or b'')
+        self.enemy_inputs = bytearray(enemy_inputs) if enemy_inputs is not None else None
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def record(self, player_input, enemy_input=None):
+        self.inputs.append(player_input)
+        if enemy_input is not None:
+            if self.enemy_inputs is None:
+                self.enemy_inputs = bytearray(len(self.inputs) - 1)
+            self.enemy_inputs.append(enemy_input)
+
+    def to_bytes(self):
+        streams = [self.inputs]
+        if self.enemy_inputs is not None:
+            streams.append(self.enemy_inputs)
+        out = bytearray(HEADER.pack(MAGIC, VERSION, len(streams), self.seed, len(self.inputs)))
+        for stream in streams:
+            encode_runs(out, stream)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < HEADER.size:
+            raise ReplayError('truncated replay header')
+        magic, version, stream_count, seed, ticks = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ReplayError('not a replay file')
+        if version != VERSION:
+            raise ReplayError(f'unsupported replay version {version}')
+        if stream_count not in (1, 2):
+            raise ReplayError(f'unsupported stream count {stream_count}')
+        pos = HEADER.size
+        inputs, pos = decode_runs(data, pos, ticks)
+        enemy_inputs = None
+        if stream_count == 2:
+            enemy_inputs, pos = decode_runs(data, pos, ticks)
+        return cls(seed, inputs, enemy_inputs)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+def match_path(path, number):
+    # Where main.py --record PATH stores match `number`, counted from 1:
+    # the number goes before the extension, so match.rpl -> match-1.rpl
+    root, ext = os.path.splitext(path)
+    return f'{root}-{number}{ext}'
+
+
+def play(replay, world=None):
+    # Re-simulate a replay headlessly at full speed and return the world in
+    # its final state
+    if world is None:
+        world = World(replay.seed)
+    else:
+        world.reset(replay.seed)
+    if replay.enemy_inputs is None:
+        for player_input in replay.inputs:
+            world.step(player_input)
+    else:
+        for player_input, enemy_input in zip(replay.inputs, replay.enemy_inputs):
+            world.step(player_input, enemy_input)
+    return world
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Re-simulate Stickman Fight replays without rendering.')
+    parser.add_argument('replays', nargs='+', help='replay files to play back')
+    args = parser.parse_args(argv)
+
+    for path in args.replays:
+        try:
+            replay = Replay.load(path)
+        except (OSError, ReplayError) as e:
+            print(f'{path}: {e}', file=sys.stderr)
+            return 1
+        world = play(replay)
+        print(f'{path}: seed={replay.seed} ticks={world.tick} wave={world.current_wave} '
+              f'score={world.score} game_over={world.game_over}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,28 @@
+from bisect import bisect_left, bisect_right
+
+# One-dimensional spatial index over fighters' x positions. Everything in
+# the game happens along the ground line, so a sorted sweep is enough:
+# rebuilding is one O(n log n) sort per tick and every range query is two
+# binary searches plus the matches, instead of testing all pairs.
+
+
+class AxisIndex:
+    def __init__(self, fighters=()):
+        self.rebuild(fighters)
+
+    def __len__(self):
+        return len(self.fighters)
+
+    def rebuild(self, fighters):
+        self.fighters = sorted(fighters, key=lambda f: f.x)
+        self.xs = [f.x for f in self.fighters]
+
+    def within(self, x, reach):
+        # Fighters strictly closer than `reach` to x, i.e. abs(f.x - x) < reach
+        lo = bisect_right(self.xs, x - reach)
+        hi = bisect_left(self.xs, x + reach)
+        return self.fighters[lo:hi]
+
+    def between(self, lo_x, hi_x):
+        # Fighters with lo_x < f.x < hi_x
+        return self.fighters[bisect_right(self.xs, lo_x):bisect_left(self.xs, hi_x)]
@@ -0,0 +1,82 @@
+from collections import OrderedDict
+
+import pygame
+
+# Cache of small pre-rendered SRCALPHA sprites. Effects used to allocate a
+# fresh Surface for every particle, trail dot and slash on every frame; now
+# each distinct (shape, size, color, alpha) is rendered once and blitted.
+
+ALPHA_STEP = 16  # Alpha is quantized so fading effects share sprites
+
+
+def quantize_alpha(alpha):
+    return max(0, min(255, (int(alpha) + ALPHA_STEP // 2) // ALPHA_STEP * ALPHA_STEP))
+
+
+class SpriteCache:
+    def __init__(self, max_size=512):
+        self.max_size = max_size
+        self.sprites = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.sprites)
+
+    def clear(self):
+        self.sprites.clear()
+
+    def get(self, key, factory):
+        # Least recently used entries are evicted once max_size is reached
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.sprites.move_to_end(key)
+            self.hits += 1
+            return sprite
+        self.misses += 1
+        sprite = factory()
+        self.sprites[key] = sprite
+        if len(self.sprites) > self.max_size:
+            self.sprites.popitem(last=False)
+        return sprite
+
+    def circle(self, radius, color, alpha):
+        alpha = quantize_alpha(alpha)
+        key = ('circle', radius, tuple(color), alpha)
+
+        def render():
+            s = pygame.Surface((radius*2, radius*2), pygame.SRCALPHA)
+            pygame.draw.circle(s, (*color, alpha), (radius, radius), radius)
+            return s
+        return self.get(key, render)
+
+    def slash(self, lines, color, glow=True):
+        # lines are ((x1, y1), (x2, y2)) pairs relative to the slash origin.
+        # Returns the sprite and the offset of its top-left corner from the
+        # origin; the sprite is drawn at full alpha and faded with set_alpha.
+        rounded = tuple((round(x1, 1), round(y1, 1), round(x2, 1), round(y2, 1))
+                        for (x1, y1), (x2, y2) in lines)
+        key = ('slash', rounded, tuple(color), glow)
+
+        def render():
+            pad = 3  # Half the glow line width plus antialiasing slack
+            xs = [x for x1, _, x2, _ in rounded for x in (x1, x2)]
+            ys = [y for _, y1, _, y2 in rounded for y in (y1, y2)]
+            left, top = int(min(xs)) - pad, int(min(ys)) - pad
+            width = int(max(xs)) - left + pad + 1
+            height = int(max(ys)) - top + pad + 1
+            s = pygame.Surface((width, height), pygame.SRCALPHA)
+            for x1, y1, x2, y2 in rounded:
+                start = (x1 - left, y1 - top)
+                end = (x2 - left, y2 - top)
+                # Main line
+                pygame.draw.line(s, (*color, 255), start, end, 2)
+                # Subtle glow
+                if glow:
+                    pygame.draw.line(s, (*color, 255 // 3), start, end, 4)
+            return s, (left, top)
+        return self.get(key, render)
+
+
+# Shared cache used by the game's draw code
+sprite_cache = SpriteCache()
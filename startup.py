@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pygame
+
+from poses import all_pose_keys, pose_sprites
+
+# Startup path of the windowed game. main() initializes only the pygame
+# subsystems it uses (display and font; no audio, joystick or camera),
+# creates the window, shows a first frame and only then finishes loading:
+# a Preloader thread opens the fonts and renders every fighter pose while
+# the main thread is already drawing. Rendering into private dicts keeps the
+# shared caches single-threaded; the main thread installs the results once
+# the thread is done, and until then renders any pose it needs itself.
+#
+# StartupTimer records milestones in milliseconds since main.py started
+# executing (interpreter start-up and, in the frozen build, unpacking are
+# not included):
+#
+#   imported      main.py and its imports are loaded
+#   initialized   display and font subsystems are up
+#   window        the window exists
+#   first_frame   the first frame has been flipped
+#   preloaded     fonts and pose sprites are installed
+
+FONT_SIZES = (36, 20)  # HUD font, profiler overlay font
+
+
+class StartupTimer:
+    def __init__(self, start):
+        self.start = start
+        self.marks = {}
+
+    def mark(self, name):
+        self.marks[name] = round((time.perf_counter() - self.start) * 1000, 2)
+
+    def report(self):
+        return ' '.join(f'{name}={ms:.1f}ms' for name, ms in self.marks.items())
+
+
+class Preloader(threading.Thread):
+    def __init__(self, fighter_size, font_sizes=FONT_SIZES):
+        super().__init__(name='preload', daemon=True)
+        self.fighter_size = fighter_size
+        self.font_sizes = font_sizes
+        self.fonts = None
+        self.fonts_ready = threading.Event()
+        self.sprites = {}
+
+    def run(self):
+        try:
+            self.fonts = [pygame.font.Font(None, size) for size in self.font_sizes]
+        finally:
+            self.fonts_ready.set()
+        for key in all_pose_keys():
+            key = (self.fighter_size, key)
+            self.sprites[key] = pose_sprites.render(*key)
+
+    def wait_fonts(self):
+        # Fonts are needed before the HUD can be drawn; they load in well
+        # under a frame, so this rarely waits
+        self.fonts_ready.wait()
+        if self.fonts is None:
+            raise RuntimeError('font loading failed')
+        return self.fonts
+
+    def install(self, sprites=pose_sprites):
+        # Main thread only, after the thread has finished. Poses rendered on
+        # demand in the meantime are kept.
+        for key, sprite in self.sprites.items():
+            sprites.cache.get(key, lambda: sprite)
+        self.sprites = {}
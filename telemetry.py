@@ -0,0 +1,201 @@
+import argparse
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+from collections import Counter
+
+# Match event telemetry. When World.events is a list, the simulation
+# appends one tuple per event:
+#
+#   (tick, kind, actor, flags, count, value)
+#
+#   kind     actor           flags          count            value
+#   ATTACK   who swung       SPIN           combo_count      -
+#   DASH     who dashed      -              direction (+-1)  -
+#   HIT      attacker        BLOCKED, SPIN  combo_count      damage dealt
+#   WAVE     -               -              enemies          new wave
+#   DEATH    who died        -              wave             score
+#
+# The game loop hands each frame's list to a TelemetryWriter, which only
+# queues it; a background thread packs the events into fixed 21-byte
+# records and appends them to a file that is rotated by size, like
+# logging.handlers.RotatingFileHandler. If the writer falls behind, whole
+# batches are dropped and counted rather than ever blocking a frame.
+#
+#   python telemetry.py events.bin          # per-match summary
+#   python telemetry.py --dump events.bin   # every event
+
+ATTACK, DASH, HIT, WAVE, DEATH = range(1, 6)
+KIND_NAMES = {ATTACK: 'attack', DASH: 'dash', HIT: 'hit', WAVE: 'wave', DEATH: 'death'}
+PLAYER, ENEMY = 0, 1
+ACTOR_NAMES = ('player', 'enemy')
+BLOCKED = 1   # Damage was halved by take_damage's facing check
+SPIN = 2      # Aerial spin attack
+
+MAGIC = b'SMEV'
+VERSION = 1
+HEADER = struct.Struct('<4sB')
+EVENT = struct.Struct('<QIBBBhf')   # match seed, then the event tuple
+
+DEFAULT_PATH = 'events.bin'
+MAX_BYTES = 4 * 1024 * 1024
+BACKUPS = 5
+FLUSH_INTERVAL = 1.0     # Seconds between writes while events trickle in
+FLUSH_BYTES = 64 * 1024  # Write early once this much is buffered
+MAX_PENDING = 600        # Batches queued before new ones are dropped
+
+
+class TelemetryWriter:
+    _CLOSE = object()
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=MAX_BYTES, backups=BACKUPS,
+                 flush_interval=FLUSH_INTERVAL, max_pending=MAX_PENDING):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(max_pending)
+        self.file = None
+        self.submitted = 0
+        self.dropped = 0
+        self.written = 0
+        self.thread = threading.Thread(target=self.run, name='telemetry', daemon=True)
+        self.thread.start()
+
+    def submit(self, match, events):
+        # Called from the game loop. Takes ownership of the `events` list.
+        if not events:
+            return
+        try:
+            self.queue.put_nowait((match, events))
+            self.submitted += len(events)
+        except queue.Full:
+            self.dropped += len(events)
+
+    def close(self):
+        # Write out everything queued so far and stop the thread
+        self.queue.put(self._CLOSE)
+        self.thread.join()
+
+    def run(self):
+        buffer = bytearray()
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                item = None
+            if item is self._CLOSE:
+                break
+            if item is not None:
+                match, events = item
+                for event in events:
+                    buffer += EVENT.pack(match, *event)
+                self.written += len(events)
+            if buffer and (len(buffer) >= FLUSH_BYTES or time.monotonic() >= deadline):
+                self.write(buffer)
+                buffer.clear()
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+        if buffer:
+            self.write(buffer)
+        if self.file is not None:
+            self.file.close()
+
+    def write(self, data):
+        # Split on record boundaries so no file grows past max_bytes
+        if self.file is None:
+            self.open()
+        view = memoryview(data)
+        while view:
+            room = (self.max_bytes - self.file.tell()) // EVENT.size * EVENT.size
+            if room <= 0 and self.file.tell() > HEADER.size:
+                self.rotate()
+                continue
+            chunk = view[:max(room, EVENT.size)]
+            self.file.write(chunk)
+            view = view[len(chunk):]
+        self.file.flush()
+
+    def open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(self.path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(HEADER.pack(MAGIC, VERSION))
+
+    def rotate(self):
+        # events.bin -> events.bin.1 -> ... -> events.bin.<backups>
+        self.file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f'{self.path}.{i}'):
+                os.replace(f'{self.path}.{i}', f'{self.path}.{i + 1}')
+        if self.backups > 0:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+        self.open()
+
+
+def read_events(path):
+    # Yields (match, tick, kind, actor, flags, count, value) per event; a
+    # record cut short by a crash is ignored
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER.size or HEADER.unpack_from(data) != (MAGIC, VERSION):
+        raise ValueError(f'{path}: not a telemetry file')
+    end = HEADER.size + (len(data) - HEADER.size) // EVENT.size * EVENT.size
+    yield from EVENT.iter_unpack(data[HEADER.size:end])
+
+
+def summarize(events):
+    # Per-match counters
+    matches = {}
+    for match, tick, kind, actor, flags, count, value in events:
+        stats = matches.setdefault(match, Counter())
+        stats['ticks'] = max(stats['ticks'], tick)
+        name = f'{ACTOR_NAMES[actor]}_{KIND_NAMES.get(kind, kind)}'
+        if kind == WAVE:
+            name = 'waves'
+        stats[name] += 1
+        if kind == HIT:
+            stats[f'{ACTOR_NAMES[actor]}_damage'] += value
+            if flags & BLOCKED:
+                stats['blocked'] += 1
+            if flags & SPIN:
+                stats['spin_hits'] += 1
+        elif kind == ATTACK:
+            stats['max_combo'] = max(stats['max_combo'], count + 1)
+        elif kind == DEATH and actor == PLAYER:
+            stats['final_score'] = value
+    return matches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Read Stickman Fight telemetry files.')
+    parser.add_argument('files', nargs='+', help='telemetry files (rotated backups included)')
+    parser.add_argument('--dump', action='store_true', help='print every event')
+    args = parser.parse_args(argv)
+
+    events = []
+    for path in args.files:
+        try:
+            events.extend(read_events(path))
+        except (OSError, ValueError) as e:
+            print(e, file=sys.stderr)
+            return 1
+    if args.dump:
+        for match, tick, kind, actor, flags, count, value in events:
+            print(f'{match} {tick:>6} {KIND_NAMES.get(kind, kind):<6} {ACTOR_NAMES[actor]:<6} '
+                  f'flags={flags} count={count} value={value:g}')
+    for match, stats in summarize(events).items():
+        print(f'match {match}: ' + ' '.join(f'{k}={v:g}' for k, v in sorted(stats.items())))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+import pytest
+
+from main import INPUT_AERIAL, INPUT_ATTACK, INPUT_JUMP, INPUT_LEFT, INPUT_RIGHT, World
+from replay import Replay, ReplayError, match_path, play
+
+# The replay format: run-length encoding of the input streams, header
+# checks, and re-simulating a recorded match to the same outcome.
+
+
+def outcome(world):
+    return (world.tick, world.current_wave, world.score, world.player.x, world.player.health,
+            world.enemy.x, world.enemy.health)
+
+
+def scripted_input(tick):
+    # Walk right swinging, with the odd jump and spin, then back off
+    if tick % 300 < 200:
+        buttons = INPUT_RIGHT | (INPUT_ATTACK if tick % 20 < 2 else 0)
+    else:
+        buttons = INPUT_LEFT
+    if tick % 150 == 0:
+        buttons |= INPUT_JUMP
+    if tick % 170 == 5:
+        buttons |= INPUT_AERIAL
+    return buttons
+
+
+def record_match(seed, ticks, enemy_inputs=False):
+    replay = Replay(seed)
+    world = World(seed)
+    for tick in range(ticks):
+        player_input = scripted_input(tick)
+        enemy_input = (INPUT_ATTACK if tick % 40 < 3 else 0) if enemy_inputs else None
+        replay.record(player_input, enemy_input)
+        world.step(player_input, enemy_input)
+    return replay, world
+
+
+def test_same_seed_same_match():
+    assert outcome(record_match(11, 900)[1]) == outcome(record_match(11, 900)[1])
+
+
+@pytest.mark.parametrize('enemy_inputs', [False, True])
+def test_round_trip_replays_match(enemy_inputs):
+    replay, world = record_match(7, 1200, enemy_inputs)
+    loaded = Replay.from_bytes(replay.to_bytes())
+    assert loaded.seed == replay.seed
+    assert loaded.inputs == replay.inputs
+    assert loaded.enemy_inputs == replay.enemy_inputs
+    assert outcome(play(loaded)) == outcome(world)
+
+
+def test_held_inputs_are_stored_as_runs():
+    inputs = bytes([INPUT_RIGHT] * 500 + [INPUT_RIGHT | INPUT_ATTACK] * 20 + [0] * 480)
+    data = Replay(1, inputs).to_bytes()
+    assert len(data) < 40
+    assert Replay.from_bytes(data).inputs == inputs
+
+
+def test_seed_range():
+    World(2**64 - 1)
+    for seed in (-1, 2**64):
+        with pytest.raises(ValueError):
+            World(seed)
+
+
+def test_large_seed():
+    replay = Replay(2**64 - 1, bytes([INPUT_RIGHT] * 10))
+    assert Replay.from_bytes(replay.to_bytes()).seed == 2**64 - 1
+
+
+def test_rejects_bad_data():
+    data = Replay(1, bytes(50)).to_bytes()
+    with pytest.raises(ReplayError):
+        Replay.from_bytes(b'XXXX' + data[4:])
+    with pytest.raises(ReplayError):
+        Replay.from_bytes(data[:5])
+    with pytest.raises(ReplayError):
+        Replay.from_bytes(data[:-1])
+
+
+def test_match_paths():
+    assert match_path('match.rpl', 1) == 'match-1.rpl'
+    assert match_path('out/match.rpl', 12) == 'out/match-12.rpl'
+    assert match_path('match', 2) == 'match-2'
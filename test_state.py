@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from bots import BOTS
+from main import HORDE_BALANCE, INPUT_AERIAL, INPUT_ATTACK, INPUT_DASH, INPUT_RIGHT, Stickman, World
+from particles import ParticlePool
+
+# Round trips of the packed formats (fighters, particle pools and saved
+# matches) and the snapshot/restore guarantees rollback relies on.
+
+
+def played(ticks, seed=1, balance=None, bot='spinner'):
+    world = World(seed, balance)
+    world.run(ticks, BOTS[bot])
+    return world
+
+
+def fight_until_corpses(world, count):
+    # Step a horde match until at least `count` corpses are down
+    while len(world.corpses) < count:
+        assert not world.game_over and world.tick < 20000
+        world.step(BOTS['dasher'](world))
+    return world
+
+
+def horde(seed=3):
+    return World(seed, HORDE_BALANCE)
+
+
+def test_fighter_pack_round_trip():
+    fighter = played(200).player
+    fighter.attack()
+    fighter.dash(1)
+    data = fighter.pack()
+    copy = Stickman(0, effects_rng=np.random.default_rng(0))
+    assert copy.unpack(data) == len(data)
+    assert copy.pack() == data
+
+
+def test_particle_pool_round_trip():
+    pool = ParticlePool(32, np.random.default_rng(5))
+    pool.emit(10, 20, (255, 0, 0), 12, size=(2, 4), speed=(1, 3))
+    for _ in range(5):
+        pool.update()
+    data = pool.pack()
+    copy = ParticlePool(32)
+    assert copy.unpack(data) == len(data)
+    assert len(copy) == len(pool)
+    assert copy.pack() == data
+
+
+def test_world_bytes_round_trip():
+    world = fight_until_corpses(horde(), 2)
+    copy = World.from_bytes(world.to_bytes())
+    assert copy.snapshot() == world.snapshot()
+    assert copy.to_bytes() == world.to_bytes()
+    for _ in range(300):
+        world.step(INPUT_ATTACK)
+        copy.step(INPUT_ATTACK)
+    assert copy.snapshot() == world.snapshot()
+
+
+def test_world_from_bytes_rejects_garbage():
+    with pytest.raises(ValueError):
+        World.from_bytes(b'not a match')
+
+
+def test_restore_then_resimulate():
+    world = played(400)
+    state = world.snapshot()
+    inputs = [(INPUT_RIGHT | INPUT_ATTACK, 0), (INPUT_AERIAL, INPUT_ATTACK), (INPUT_DASH, 0)] * 100
+    for player_input, enemy_input in inputs:
+        world.step(player_input, enemy_input)
+    expected = world.snapshot()
+
+    world.restore(state)
+    assert world.snapshot() == state
+    for player_input, enemy_input in inputs:
+        world.step(player_input, enemy_input)
+    assert world.snapshot() == expected
+
+
+def test_restore_into_another_world():
+    state = played(400).snapshot()
+    other = played(900, seed=2)
+    other.restore(state)
+    assert other.snapshot() == state
+
+
+def test_restore_keeps_corpses():
+    world = fight_until_corpses(horde(), 1)
+    early = world.snapshot()
+    late = fight_until_corpses(world, len(early.corpses) + 1).snapshot()
+
+    # Back, then forward again: the later corpses come back
+    world.restore(early)
+    assert world.snapshot() == early
+    world.restore(late)
+    assert world.snapshot() == late
+    assert world.corpses == list(late.corpses)
+
+    fresh = World(0)
+    fresh.restore(late)
+    assert fresh.snapshot() == late
+    assert World.from_bytes(fresh.to_bytes()).snapshot() == late
@@ -0,0 +1,163 @@
+import os
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import csv
+import itertools
+import multiprocessing
+import sys
+
+import numpy as np
+
+from bots import BOTS
+from main import Balance, World, parse_seed
+
+# Parallel headless tournaments for AI and balance work. Matches are sharded
+# across a process pool; each worker runs World with its own seed and sends
+# one result row back per match, which the parent streams to CSV or
+# collects into columnar .npz output.
+#
+#   python tournament.py --matches 500 --bot chaser \
+#       --sweep attack_chance_max=0.4,0.6,0.8 --sweep enemy_max_speed=6,8 \
+#       --out results.csv
+
+RESULT_COLUMNS = ['config', 'seed', 'bot', 'waves', 'score',
+                  'damage_dealt', 'damage_taken', 'ticks']
+
+
+def run_match(job):
+    # Runs in a worker process
+    config, overrides, seed, bot, max_ticks = job
+    world = World(seed, Balance()._replace(**overrides))
+    world.run(max_ticks, BOTS[bot])
+    row = {
+        'config': config,
+        'seed': seed,
+        'bot': bot,
+        'waves': world.current_wave,
+        'score': world.score,
+        'damage_dealt': world.damage_dealt,
+        'damage_taken': world.damage_taken,
+        'ticks': world.tick,
+    }
+    row.update(overrides)
+    return row
+
+
+def parse_assignment(text, multiple):
+    name, sep, values = text.partition('=')
+    if not sep or name not in Balance._fields:
+        raise argparse.ArgumentTypeError(
+            f'expected NAME=VALUE with NAME one of: {", ".join(Balance._fields)}')
+    try:
+        parsed = [float(v) for v in values.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'bad number in {text!r}')
+    if not multiple and len(parsed) != 1:
+        raise argparse.ArgumentTypeError(f'--set takes a single value: {text!r}')
+    return name, parsed
+
+
+def build_configs(fixed, sweeps):
+    # Cartesian product of all swept values, each merged over the fixed ones
+    names = [name for name, _ in sweeps]
+    configs = []
+    for values in itertools.product(*[values for _, values in sweeps]):
+        overrides = {name: values[0] for name, values in fixed}
+        overrides.update(zip(names, values))
+        configs.append(overrides)
+    return configs
+
+
+def build_jobs(configs, matches, seed, bot, max_ticks):
+    # Every config plays the same seeds so configs are compared on
+    # identical spawn/roll sequences
+    return [(config, overrides, seed + i, bot, max_ticks)
+            for config, overrides in enumerate(configs)
+            for i in range(matches)]
+
+
+class CsvSink:
+    def __init__(self, path, columns):
+        self.file = open(path, 'w', newline='') if path != '-' else sys.stdout
+        self.writer = csv.DictWriter(self.file, columns)
+        self.writer.writeheader()
+
+    def write(self, row):
+        self.writer.writerow(row)
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+class NpzSink:
+    # Columnar output: one array per column in a single .npz file
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = {name: [] for name in columns}
+
+    def write(self, row):
+        for name, values in self.columns.items():
+            values.append(row[name])
+
+    def close(self):
+        np.savez_compressed(self.path, **{name: np.asarray(values)
+                                          for name, values in self.columns.items()})
+
+
+def summarize(rows_by_config, configs, out):
+    for config, overrides in enumerate(configs):
+        rows = rows_by_config.get(config, [])
+        if not rows:
+            continue
+        label = ' '.join(f'{k}={v:g}' for k, v in overrides.items()) or 'default balance'
+        waves = np.array([r['waves'] for r in rows])
+        ticks = np.array([r['ticks'] for r in rows])
+        score = np.array([r['score'] for r in rows])
+        print(f'[{config}] {label}: matches={len(rows)} waves mean={waves.mean():.2f} '
+              f'p50={np.median(waves):g} max={waves.max()} score mean={score.mean():.0f} '
+              f'ticks mean={ticks.mean():.0f}', file=out)
+
+
+def run_tournament(jobs, sink, workers=None, chunksize=16):
+    rows_by_config = {}
+    with multiprocessing.Pool(workers) as pool:
+        for row in pool.imap_unordered(run_match, jobs, chunksize):
+            sink.write(row)
+            rows_by_config.setdefault(row['config'], []).append(row)
+    sink.close()
+    return rows_by_config
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run headless Stickman Fight tournaments across all cores.')
+    parser.add_argument('--matches', type=int, default=100, help='matches per balance config')
+    parser.add_argument('--bot', choices=sorted(BOTS), default='chaser', help='player controller')
+    parser.add_argument('--seed', type=parse_seed, default=0, help='seed of the first match')
+    parser.add_argument('--max-ticks', type=int, default=60 * 60 * 10,
+                        help='tick limit per match (default: ten minutes at 60 FPS)')
+    parser.add_argument('--set', dest='fixed', action='append', default=[],
+                        type=lambda t: parse_assignment(t, False), metavar='NAME=VALUE',
+                        help='override a Balance constant for every config')
+    parser.add_argument('--sweep', action='append', default=[],
+                        type=lambda t: parse_assignment(t, True), metavar='NAME=V1,V2,...',
+                        help='sweep a Balance constant (repeatable; configs are the cartesian product)')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--chunksize', type=int, default=16, help='matches handed to a worker at a time')
+    parser.add_argument('--out', default='-', help='output file: .npz for columnar arrays, otherwise CSV (default: stdout)')
+    args = parser.parse_args(argv)
+
+    configs = build_configs(args.fixed, args.sweep)
+    jobs = build_jobs(configs, args.matches, args.seed, args.bot, args.max_ticks)
+    columns = RESULT_COLUMNS + sorted({name for overrides in configs for name in overrides})
+    sink = NpzSink(args.out, columns) if args.out.endswith('.npz') else CsvSink(args.out, columns)
+
+    rows_by_config = run_tournament(jobs, sink, args.workers, args.chunksize)
+    summarize(rows_by_config, configs, sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())